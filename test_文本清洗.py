@@ -0,0 +1,60 @@
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from 文本清洗 import clean_text, clean_text_series, clean_text_value, clean_texts
+
+
+# 改写前 数据爬取.clean_text 的实现，作为一致性对照
+def reference_clean_text(text):
+    if not isinstance(text, str):
+        return text
+    text = text.replace('\u3000', '').replace('\xa0', '').replace('\u200b', '')
+    text = re.sub(r'[\r\n\t]', '', text)
+    text = re.sub(r'[^\x00-\x7F\u4e00-\u9fff，。！？、（）【】《》“”‘’：；]', '', text)
+    return text.strip()
+
+
+# 改写前 数据预处理.clean_text_value 的实现，作为一致性对照
+def reference_clean_text_value(text):
+    if not isinstance(text, str):
+        return text
+    text = text.replace('\u3000', ' ').replace('\xa0', ' ').replace('\u200b', ' ')
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?;:\'"()\[\]{}<>@#$%^&*\-_+=/\\|`~·！￥（）——【】《》？，。；：‘’“”€£¥]', '', text, flags=re.UNICODE)
+    return text.strip()
+
+
+ALPHABET = ('abcXYZ019 .,-_/()（）【】，。：；“”·—€' '大众丰田本田宝马奔驰中型SUV紧凑型车'
+            '\u3000\xa0\u200b\r\n\t\x0b\x0c\x1c é²★\U0001F697\ufeff、')
+SPECIAL = [None, float('nan'), 12, 3.5, '', '  ', '\u200b\u3000 \xa0', '大众 ★ 朗逸', '\t宝马\r\n3系\u3000']
+
+
+@pytest.fixture(scope='module')
+def samples():
+    rng = random.Random(0)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30))) for _ in range(20000)] + SPECIAL
+
+
+def same(a, b):
+    return a == b or (pd.isna(a) and pd.isna(b))
+
+
+def test_clean_text_matches_reference(samples):
+    assert [text for text in samples if not same(clean_text(text), reference_clean_text(text))] == []
+
+
+def test_clean_texts_matches_reference(samples):
+    assert all(map(same, clean_texts(samples), map(reference_clean_text, samples)))
+
+
+def test_clean_text_value_matches_reference(samples):
+    assert [text for text in samples if not same(clean_text_value(text), reference_clean_text_value(text))] == []
+
+
+def test_clean_text_series_matches_reference(samples):
+    series = pd.Series(samples + samples[:500], dtype=object, index=range(100, 100 + len(samples) + 500), name='品牌')
+    expected = series.astype(str).apply(reference_clean_text_value)
+    pd.testing.assert_series_equal(clean_text_series(series), expected)
@@ -0,0 +1,165 @@
+import argparse
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from 模型训练 import DEFAULT_MODEL_FILE, feature_schema_hash, load_model
+
+# 未命中缓存的条数少于该值时走随机森林的逐树快速路径，否则使用模型自带的多线程 predict()
+SMALL_BATCH_SIZE = 1000
+
+
+class PricePredictor:
+    """
+    二手车价格预测器。
+    只在创建时加载一次模型和类别编码，支持单条或批量预测：
+    - 整批数据一次性向量化推理；
+    - 相同的特征组合通过 LRU 缓存直接返回；
+    - 训练时未出现过的品牌/车辆级别按缺失值处理（模型会走样本最多的分支），不会报错。
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_FILE, cache_size=100000):
+        bundle = load_model(model_path)
+        if bundle.get('schema_hash') != feature_schema_hash(bundle['backend']):
+            raise ValueError(f"模型的特征定义与当前代码不一致，请重新训练模型: {model_path}")
+        self.model = bundle['model']
+        # 特征顺序和分类特征都以模型包为准：词表中有的列按类别编码，其余按数值处理
+        self.features = bundle['features']
+        # 使用特征存储的持久化词表编码，与训练时的编码完全一致；字典查找可以直接识别未知类别
+        self.category_codes = {
+            col: {value: code for code, value in enumerate(values)}
+            for col, values in bundle['vocab'].items()
+        }
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _feature_key(self, listing):
+        try:
+            return tuple(str(listing[col]) if col in self.category_codes else float(listing[col])
+                         for col in self.features)
+        except KeyError as e:
+            raise ValueError(f"缺少字段: {e.args[0]}")
+        except (TypeError, ValueError):
+            raise ValueError(f"字段格式错误: {listing}")
+
+    def _encode(self, keys):
+        X = np.empty((len(keys), len(self.features)), dtype=np.float32)
+        unknown = [[] for _ in keys]
+        for j, col in enumerate(self.features):
+            if col in self.category_codes:
+                codes = self.category_codes[col]
+                for i, key in enumerate(keys):
+                    code = codes.get(key[j])
+                    if code is None:
+                        unknown[i].append(col)
+                        X[i, j] = np.nan
+                    else:
+                        X[i, j] = code
+            else:
+                X[:, j] = [key[j] for key in keys]
+        return X, unknown
+
+    def _predict_keys(self, keys):
+        X, unknown = self._encode(keys)
+        if len(keys) < SMALL_BATCH_SIZE and hasattr(self.model, 'estimators_'):
+            # 小批量时直接逐棵树预测再取平均，跳过 predict() 的输入校验和线程调度，单条延迟降低一个数量级
+            prices = sum(tree.tree_.predict(X)[:, 0] for tree in self.model.estimators_) / len(self.model.estimators_)
+            return prices, unknown
+        return self.model.predict(X), unknown
+
+    def predict(self, listings):
+        """
+        预测价格（万元）。listings 可以是单个字典或字典列表，
+        返回 [{'预测价格_万': ..., '未知类别': [...]}, ...]，单个字典输入时返回单个结果。
+        """
+        single = isinstance(listings, dict)
+        if single:
+            listings = [listings]
+        keys = [self._feature_key(listing) for listing in listings]
+
+        results = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+        missing = list(dict.fromkeys(key for key in keys if key not in results))
+
+        if missing:
+            prices, unknown = self._predict_keys(missing)
+            with self._lock:
+                for key, price, unknown_cols in zip(missing, prices, unknown):
+                    result = {'预测价格_万': round(float(price), 2), '未知类别': unknown_cols}
+                    results[key] = result
+                    self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        output = [results[key] for key in keys]
+        return output[0] if single else output
+
+
+def make_handler(predictor):
+    class PredictHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'error': '未找到该接口'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': '未找到该接口'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length).decode('utf-8'))
+                # 支持单条 {...}、列表 [...] 或 {"listings": [...]}
+                if isinstance(payload, dict) and 'listings' in payload:
+                    payload = payload['listings']
+                if not isinstance(payload, (dict, list)):
+                    raise ValueError("请求体必须是车辆信息对象或列表")
+                result = predictor.predict(payload)
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, {'predictions': result})
+
+        def log_message(self, format, *args):
+            # 高频请求下不逐条打印访问日志
+            pass
+
+    return PredictHandler
+
+
+def serve(host='127.0.0.1', port=8000, model_path=DEFAULT_MODEL_FILE):
+    predictor = PricePredictor(model_path)
+    server = ThreadingHTTPServer((host, port), make_handler(predictor))
+    print(f"价格预测服务已启动: http://{host}:{port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='二手车价格预测服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default=DEFAULT_MODEL_FILE, help='训练好的模型文件')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.model)
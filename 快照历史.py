@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+KEY = '车辆ID'
+PRICE_FIELD = '价格(万)'
+DEFAULT_HISTORY_DIR = 'datas/快照历史'
+CHECKPOINT_INTERVAL = 10  # 每隔多少个快照额外保存一次完整快照
+IGNORED_FIELDS = ['页码']  # 列表页码随排序每次都会变化，记录它只会产生无意义的变更
+
+
+def _normalize(data):
+    """
+    统一成以车辆ID为索引、全部为字符串的表，缺失值记为空字符串，避免 3 / 3.0 / NaN 之类的假变更。
+    没有车辆ID（空值或解析失败时的“未知”）的行无法跨快照对应，直接丢弃。
+    """
+    df = pd.DataFrame(data)
+    df = df.drop(columns=[col for col in IGNORED_FIELDS if col in df.columns])
+    df = df.astype(object).where(df.notna(), '').astype(str)
+    df = df[~df[KEY].isin(['', '未知'])].drop_duplicates(subset=KEY, keep='last')
+    return df.set_index(KEY)
+
+
+def _compact(df):
+    # 以分类类型保存：城市、品牌、级别等重复取值只存一份，再由 gzip 压缩
+    return df.astype('category')
+
+
+class SnapshotStore:
+    """
+    爬取快照的历史存储，记录每条车源在多次爬取之间的上架、下架和字段变化。
+    - 每次爬取只保存与上一次快照的差异：新增车源的完整行、下架车源的车辆ID、
+      以及已有车源变化字段的长表（车辆ID, 字段, 新值），存储量随变化量增长，而不是随 快照数 × 车源数 增长；
+    - 每隔 CHECKPOINT_INTERVAL 个快照额外保存一次完整快照，重建任意时点的数据时
+      只需读取最近的完整快照并向后应用不超过 CHECKPOINT_INTERVAL 个差异；
+    - 差异和完整快照都是按列存储的分类类型 DataFrame（gzip 压缩的 pickle）。
+    目录结构：manifest.json（快照列表）、delta_00001.pkl.gz ...、checkpoint_00010.pkl.gz ...
+    """
+
+    def __init__(self, root=DEFAULT_HISTORY_DIR, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.root = root
+        self.checkpoint_interval = checkpoint_interval
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'key': KEY, 'columns': [], 'snapshots': []}
+
+    @property
+    def snapshots(self):
+        return self.manifest['snapshots']
+
+    @property
+    def latest_snapshot(self):
+        return self.snapshots[-1] if self.snapshots else None
+
+    def _path(self, filename):
+        return os.path.join(self.root, filename)
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load_delta(self, info):
+        return pd.read_pickle(self._path(info['delta_file']))
+
+    def get_snapshot(self, snapshot=None, at=None):
+        """按快照编号或时间点查找快照，at 为时间字符串时返回该时刻之前的最后一个快照"""
+        if not self.snapshots:
+            raise ValueError(f"快照历史为空: {self.root}")
+        if at is not None:
+            at = pd.Timestamp(at)
+            candidates = [info for info in self.snapshots if pd.Timestamp(info['created']) <= at]
+            if not candidates:
+                raise ValueError(f"{at} 之前没有快照")
+            return candidates[-1]
+        if snapshot is None:
+            return self.latest_snapshot
+        for info in self.snapshots:
+            if info['snapshot'] == snapshot:
+                return info
+        raise ValueError(f"快照历史中不存在快照 {snapshot}")
+
+    def reconstruct(self, snapshot=None, at=None):
+        """重建指定快照（默认最新）时的完整车源表，以车辆ID为索引"""
+        target = self.get_snapshot(snapshot, at)['snapshot']
+        base = None
+        for info in self.snapshots[:target]:
+            if info.get('checkpoint_file'):
+                base = info
+        if base is None:
+            state = pd.DataFrame(columns=self.manifest['columns'], index=pd.Index([], name=KEY), dtype=str)
+            start = 0
+        else:
+            state = pd.read_pickle(self._path(base['checkpoint_file'])).astype(str)
+            start = base['snapshot']
+        for info in self.snapshots[start:target]:
+            state = self._apply_delta(state, self._load_delta(info))
+        return state.reindex(columns=self.manifest['columns'], fill_value='')
+
+    @staticmethod
+    def _apply_delta(state, delta):
+        state = state.drop(index=delta['removed'])
+        changed = delta['changed']
+        for field, group in changed.groupby('字段', observed=True):
+            if field not in state.columns:
+                state[field] = ''
+            state.loc[group[KEY].astype(str).to_numpy(), field] = group['新值'].astype(str).to_numpy()
+        added = delta['added'].astype(str)
+        return pd.concat([state, added.reindex(columns=state.columns.union(added.columns, sort=False), fill_value='')])
+
+    def record(self, data, scope=None):
+        """
+        记录一次爬取结果（DataFrame 或字典列表），与上一次快照比较后保存差异。
+        scope 为空表示全量爬取，上一快照中本次没有出现的车源都记为下架；
+        部分爬取时传入 {'cities': [...], 'pages': n, 'complete_cities': [...]}，
+        只有 complete_cities（已翻到最后一页的城市）中消失的车源记为下架，其余未爬到的车源原样保留。
+        返回本次快照的信息（新增、下架、变化字段数量等）。
+        """
+        current = _normalize(data)
+        previous = self.reconstruct() if self.snapshots else _normalize(pd.DataFrame(columns=[KEY]))
+        columns = list(dict.fromkeys(self.manifest['columns'] + list(current.columns)))
+        previous = previous.reindex(columns=columns, fill_value='')
+        current = current.reindex(columns=columns, fill_value='')
+
+        carried = pd.Index([], dtype=object)
+        if scope is not None:
+            missing = previous.index.difference(current.index, sort=False)
+            complete = previous.loc[missing, '城市'].isin(scope.get('complete_cities') or []) \
+                if '城市' in previous.columns else np.zeros(len(missing), dtype=bool)
+            carried = missing[~np.asarray(complete)]
+            current = pd.concat([current, previous.loc[carried]])
+
+        added_ids = current.index.difference(previous.index, sort=False)
+        removed_ids = previous.index.difference(current.index, sort=False)
+        common = current.index.intersection(previous.index, sort=False)
+        old_values = previous.loc[common].to_numpy()
+        new_values = current.loc[common].to_numpy()
+        rows, cols = np.nonzero(old_values != new_values)
+        changed = pd.DataFrame({
+            KEY: common.to_numpy()[rows],
+            '字段': pd.Categorical(np.asarray(columns, dtype=object)[cols], categories=columns),
+            '新值': new_values[rows, cols],
+        })
+
+        snapshot = len(self.snapshots) + 1
+        os.makedirs(self.root, exist_ok=True)
+        info = {
+            'snapshot': snapshot,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'n_listings': len(current),
+            'scope': scope,
+            'carried': len(carried),
+            'added': len(added_ids),
+            'removed': len(removed_ids),
+            'changed_listings': int(changed[KEY].nunique()),
+            'changed_fields': len(changed),
+            'delta_file': f'delta_{snapshot:05d}.pkl.gz',
+            'checkpoint_file': None,
+        }
+        pd.to_pickle({
+            'added': _compact(current.loc[added_ids]),
+            'removed': removed_ids.to_numpy(),
+            'changed': changed.astype({KEY: 'category'}),
+        }, self._path(info['delta_file']))
+        if snapshot % self.checkpoint_interval == 0:
+            info['checkpoint_file'] = f'checkpoint_{snapshot:05d}.pkl.gz'
+            pd.to_pickle(_compact(current), self._path(info['checkpoint_file']))
+
+        self.manifest['columns'] = columns
+        self.snapshots.append(info)
+        self._save_manifest()
+        return info
+
+    def price_history(self, listing_ids, field=PRICE_FIELD):
+        """
+        查询车源的价格变化历史，只读取差异文件。
+        返回列：快照、时间、车辆ID、事件（上架/调价/下架）、价格（原始文本）、价格_万。
+        """
+        ids = pd.Index([str(listing_id) for listing_id in listing_ids])
+        records = []
+        for info in self.snapshots:
+            delta = self._load_delta(info)
+            added = delta['added']
+            hits = added.index.intersection(ids)
+            if len(hits) and field in added.columns:
+                for listing_id, price in added.loc[hits, field].astype(str).items():
+                    records.append((info['snapshot'], info['created'], listing_id, '上架', price))
+            changed = delta['changed']
+            changed = changed[(changed['字段'] == field) & changed[KEY].astype(str).isin(ids)]
+            for listing_id, price in zip(changed[KEY].astype(str), changed['新值']):
+                records.append((info['snapshot'], info['created'], listing_id, '调价', price))
+            for listing_id in ids.intersection(pd.Index(delta['removed'])):
+                records.append((info['snapshot'], info['created'], listing_id, '下架', ''))
+
+        history = pd.DataFrame(records, columns=['快照', '时间', KEY, '事件', '价格'])
+        history['价格_万'] = pd.to_numeric(history['价格'].str.replace('万', '', regex=False).str.strip(),
+                                         errors='coerce')
+        return history.sort_values([KEY, '快照'], kind='stable').reset_index(drop=True)
+
+    def storage_bytes(self):
+        """存储目录的总字节数"""
+        return sum(os.path.getsize(self._path(name)) for name in os.listdir(self.root))
+
+
+def record_snapshot(data, root=DEFAULT_HISTORY_DIR, scope=None):
+    """把一次爬取结果记入快照历史并打印变化情况，scope 的含义见 SnapshotStore.record"""
+    info = SnapshotStore(root).record(data, scope)
+    print(f"快照历史已更新: 快照 {info['snapshot']}，共 {info['n_listings']} 条车源，"
+          f"新增 {info['added']}，下架 {info['removed']}，{info['changed_listings']} 条车源有字段变化"
+          + (f"，爬取范围外保留 {info['carried']} 条" if info['carried'] else ''))
+    return info
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='二手车爬取快照历史')
+    parser.add_argument('--root', default=DEFAULT_HISTORY_DIR, help='快照历史目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    record_parser = sub.add_parser('record', help='把爬取结果 CSV 记为一个新快照')
+    record_parser.add_argument('csv', help='爬取结果 CSV 文件')
+    sub.add_parser('list', help='列出所有快照')
+    show_parser = sub.add_parser('show', help='重建某个快照时的完整数据')
+    show_parser.add_argument('--snapshot', type=int, default=None, help='快照编号，默认最新')
+    show_parser.add_argument('--at', default=None, help='时间点，如 "2025-06-14 12:00"')
+    show_parser.add_argument('--output', default=None, help='保存为 CSV 文件')
+    history_parser = sub.add_parser('history', help='查询车源的价格变化历史')
+    history_parser.add_argument('ids', nargs='+', help='车辆ID')
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    if args.command == 'record':
+        record_snapshot(pd.read_csv(args.csv, dtype=str, keep_default_na=False, encoding='utf-8-sig'), args.root)
+    elif args.command == 'list':
+        print(pd.DataFrame(store.snapshots).drop(columns=['delta_file', 'checkpoint_file', 'scope'],
+                                                 errors='ignore').to_string(index=False))
+    elif args.command == 'show':
+        snapshot = store.reconstruct(args.snapshot, args.at)
+        if args.output:
+            snapshot.to_csv(args.output, encoding='utf-8-sig')
+            print(f"快照已保存到: {args.output}")
+        else:
+            print(snapshot)
+    else:
+        print(store.price_history(args.ids).to_string(index=False))
@@ -0,0 +1,335 @@
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import threading
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+from 数据爬取 import CSV_FIELDS, get_province_capitals
+from 数据预处理 import clean_used_car_data, postprocess_cleaned_data
+from 数据可视化 import prepare_scatter_data
+from 数据聚合 import PriceCube
+from 特征存储 import FeatureStore
+from 模型训练 import train_price_model
+
+DATASET_SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+DEFAULT_WORKDIR = 'bench_data'
+DEFAULT_REPORT_DIR = 'benchmarks'
+# 生成数据时每批写入的行数，保证生成 1000 万行时内存占用也有上限
+GENERATE_CHUNK_ROWS = 250_000
+
+# (品牌, 车系, 车辆级别, 新车价格_万, 排量, 马力)
+CAR_SERIES = [
+    ('大众', '途观L', '中型SUV', 25.0, '2.0', 220), ('大众', '朗逸', '紧凑型车', 12.0, '1.5', 113),
+    ('大众', '帕萨特', '中型车', 20.0, '2.0', 186), ('丰田', '凯美瑞', '中型车', 20.0, '2.5', 209),
+    ('丰田', '卡罗拉', '紧凑型车', 12.0, '1.2', 116), ('本田', '雅阁', '中型车', 19.0, '1.5', 194),
+    ('本田', '飞度', '小型车', 8.0, '1.5', 131), ('日产', '轩逸', '紧凑型车', 11.0, '1.6', 135),
+    ('奥迪', 'A4L', '中型车', 32.0, '2.0', 190), ('奥迪', 'Q5L', '中型SUV', 42.0, '2.0', 265),
+    ('宝马', '3系', '中型车', 33.0, '2.0', 184), ('宝马', 'X5', '中大型SUV', 70.0, '3.0', 340),
+    ('奔驰', 'C级', '中型车', 34.0, '1.5', 204), ('奔驰', 'GLC', '中型SUV', 45.0, '2.0', 258),
+    ('别克', 'GL8', 'MPV', 28.0, '2.0', 237), ('哈弗', 'H6', '紧凑型SUV', 11.0, '1.5', 169),
+    ('比亚迪', '秦PLUS', '紧凑型车', 12.0, '1.5', 110), ('吉利', '帝豪', '紧凑型车', 8.0, '1.5', 114),
+    ('长安', 'CS75', '紧凑型SUV', 12.0, '1.5', 178), ('马自达', '阿特兹', '中型车', 18.0, '2.5', 192),
+    ('雷克萨斯', 'ES', '中大型车', 35.0, '2.5', 209), ('保时捷', 'Cayenne', '中大型SUV', 100.0, '3.0', 340),
+    ('MINI', 'COOPER', '小型车', 25.0, '1.5', 136), ('Jeep', '自由光', '中型SUV', 20.0, '2.0', 265),
+]
+TRIMS = ['自动豪华版', '自动舒适版', '手动精英版', '自动尊贵型', '两驱智享版', '四驱旗舰版']
+GEARBOXES = ['自动', '手动', '双离合', 'CVT无级变速']
+EMISSIONS = ['国VI', '国V', '国IV', '国VI(b)']
+COLORS = ['白色', '黑色', '银灰色', '深灰色', '红色', '蓝色', '黑色/棕', '白色/黑', '其它']
+FUELS = ['92号', '95号', '95号', '92号', '0号', '98号']
+DRIVES = ['前置前驱', '前置四驱', '后置后驱', '前置后驱']
+CONFIGS = ['天窗 倒车影像 定速巡航', '全景天窗 自适应巡航 真皮座椅', '倒车雷达 蓝牙 多功能方向盘']
+CONDITIONS = ['车况精品', '无事故 无泡水', '原版原漆', '小剐蹭已修复']
+# 模拟爬取数据中的不可见字符和乱码
+DIRT = ['', '', '', '', '\u3000', '\xa0', '\u200b', '★', '\r\n', ' ']
+
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _blank(rng, values, rate, fill=''):
+    """按比例把部分取值替换为空值，模拟详情页缺失字段"""
+    values = values.copy()
+    values[rng.random(len(values)) < rate] = fill
+    return values
+
+
+def _num_str(values, decimals):
+    return pd.Series(np.round(values, decimals)).astype(str).to_numpy(dtype=object)
+
+
+def generate_chunk(rng, n, id_offset, duplicate_rate=0.03):
+    """生成 n 行与 save_to_csv 列结构一致的模拟爬取数据"""
+    series_idx = rng.integers(0, len(CAR_SERIES), n)
+    series = [np.array(col, dtype=object)[series_idx] for col in zip(*CAR_SERIES)]
+    brand, model_name, level, new_price, displacement, horsepower = series
+
+    year = rng.integers(2008, 2025, n)
+    month = rng.integers(1, 13, n)
+    age = 2025 - year + rng.random(n)
+    mileage = np.clip(age * rng.uniform(0.4, 2.2, n), 0.01, 60)
+    price = new_price.astype('float64') * 0.86 ** age * rng.lognormal(0, 0.15, n)
+    turbo = np.where(rng.random(n) < 0.6, 'T', 'L').astype(object)
+    gearbox = _pick(rng, GEARBOXES, n)
+    city = _pick(rng, [city['name'] for city in get_province_capitals()], n)
+    year_str = year.astype(str).astype(object)
+    month_str = pd.Series(month).map('{:02d}'.format).to_numpy(dtype=object)
+    price_str = _num_str(price, 2)
+    mileage_str = _num_str(mileage, 2)
+
+    car_name = brand + ' ' + model_name + ' ' + year_str + '款 ' + _pick(rng, TRIMS, n)
+    car_name_dirty = _pick(rng, DIRT, n) + car_name + _pick(rng, DIRT, n)
+    color = _pick(rng, COLORS, n)
+    drive = _pick(rng, DRIVES, n)
+    engine = displacement + turbo + ' ' + horsepower.astype(str) + '马力 L4'
+
+    # 车辆ID：大部分唯一，按 duplicate_rate 的比例复用本批中其他行的ID，模拟同一辆车被重复爬取
+    ids = np.arange(id_offset, id_offset + n) + 40_000_000
+    dup = rng.random(n) < duplicate_rate
+    ids[dup] = ids[rng.integers(0, n, dup.sum())]
+    ids = ids.astype(str).astype(object)
+    ids = _blank(rng, ids, 0.002, '未知')
+    dealer = rng.integers(100_000, 999_999, n).astype(str).astype(object)
+
+    message = ('【车辆名称】' + car_name + '【驱动方式】' + drive + '【颜色】' + color + '【出厂时间】' + year_str
+               + '年【行驶里程】' + mileage_str + '万公里【车况】' + _pick(rng, CONDITIONS, n)
+               + '【车辆配置】' + _pick(rng, CONFIGS, n))
+
+    columns = {
+        '列表_车名': _blank(rng, car_name, 0.01, '未知'),
+        '列表_价格(万)': _blank(rng, price_str, 0.01, '未知'),
+        '列表_里程(万公里)': _blank(rng, mileage_str, 0.01, '未知'),
+        '列表_上牌时间': year_str + '-' + month_str,
+        '车辆ID': ids,
+        '经销商ID': dealer,
+        '城市': city,
+        '页码': rng.integers(1, 6, n),
+        '详情URL': 'https://www.che168.com/dealer/' + dealer + '/' + ids + '.html',
+        '车辆名称': _blank(rng, car_name_dirty, 0.05),
+        '价格(万)': _blank(rng, _blank(rng, price_str + '万', 0.01, '-3.5万'), 0.05),
+        '表显里程': _blank(rng, mileage_str + '万公里', 0.05),
+        '上牌时间': _blank(rng, year_str + '年' + month_str + '月', 0.05),
+        '挡位排量': gearbox + ' / ' + displacement + turbo,
+        '车辆所在地': city,
+        '档案_上牌时间': year_str + '-' + month_str,
+        '档案_表显里程': mileage_str + '万公里',
+        '变速箱': gearbox,
+        '排放标准': _blank(rng, _pick(rng, EMISSIONS, n), 0.01),
+        '排量': displacement + turbo,
+        '发布时间': '2025-06-' + pd.Series(rng.integers(1, 29, n)).map('{:02d}'.format).to_numpy(dtype=object),
+        '年检到期': (year + 2).astype(str).astype(object) + '-' + month_str,
+        '保险到期': '2026-' + month_str,
+        '质保到期': _pick(rng, ['已过期', '2026-12', '未知'], n),
+        '过户次数': _blank(rng, _pick(rng, ['0次', '1次', '2次', '3次'], n), 0.01),
+        '档案_所在地': city,
+        '发动机': _blank(rng, engine, 0.01),
+        '车辆级别': _blank(rng, level, 0.02),
+        '车身颜色': color,
+        '燃油标号': _pick(rng, FUELS, n),
+        '驱动方式': drive,
+        '留言信息': message,
+        '留言_车辆名称': car_name,
+        '留言_驱动方式': drive,
+        '留言_颜色': color,
+        '留言_出厂时间': year_str + '年',
+        '留言_交强日期': '2026-' + month_str,
+        '留言_行驶里程': mileage_str + '万公里',
+        '留言_车辆排量': displacement + turbo,
+        '留言_车辆状态': _pick(rng, ['在售', '已预订'], n),
+        '留言_钥匙': _pick(rng, ['2把', '1把'], n),
+        '留言_车况': _pick(rng, CONDITIONS, n),
+        '留言_车辆配置': _pick(rng, CONFIGS, n),
+    }
+    return pd.DataFrame(columns, columns=CSV_FIELDS)
+
+
+def generate_crawl_csv(path, n_rows, seed=42, duplicate_rate=0.03):
+    """分批生成 n_rows 行模拟爬取数据并写入 CSV（utf-8-sig，与 save_to_csv 一致）"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        while written < n_rows:
+            n = min(GENERATE_CHUNK_ROWS, n_rows - written)
+            generate_chunk(rng, n, written, duplicate_rate).to_csv(f, index=False, header=written == 0)
+            written += n
+    return path
+
+
+def _current_rss():
+    """当前进程常驻内存（字节），仅 Linux 可用，其他平台返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler(threading.Thread):
+    """后台线程定期采样进程常驻内存，记录峰值；不像 tracemalloc 那样拖慢被测代码"""
+
+    def __init__(self, interval=0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.baseline = _current_rss()
+        self.peak = self.baseline
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = _current_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = _current_rss()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+
+def measure(func, *args, **kwargs):
+    """运行 func 并返回 (结果, {'seconds', 'peak_rss_mb', 'peak_rss_delta_mb'})，内存为进程常驻内存峰值"""
+    gc.collect()
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            result = func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+    stats = {'seconds': round(elapsed, 3), 'peak_rss_mb': None, 'peak_rss_delta_mb': None}
+    if sampler.baseline is not None:
+        stats['peak_rss_mb'] = round(sampler.peak / 2 ** 20, 1)
+        stats['peak_rss_delta_mb'] = round((sampler.peak - sampler.baseline) / 2 ** 20, 1)
+    return result, stats
+
+
+def _chart_aggregations(df):
+    cube = PriceCube.from_frame(df)
+    cube.rollup('品牌')
+    cube.boxplot_stats('上牌年份')
+    cube.violin_stats('车辆级别')
+    df_viz = df[['价格_万', '里程_万公里', '上牌年份', '品牌', '车辆级别']].dropna()
+    prepare_scatter_data(df_viz)
+    return cube
+
+
+def _train(store):
+    X, y = store.load()
+    return train_price_model(X, y, store.vocab, cv=0)
+
+
+def run_size(label, n_rows, workdir, seed=42):
+    """对单个数据规模执行全部测试阶段，返回各阶段的耗时和内存峰值"""
+    size_dir = os.path.join(workdir, label)
+    shutil.rmtree(size_dir, ignore_errors=True)
+    raw_file = os.path.join(size_dir, '全国省会二手车详细数据.csv')
+    cleaned_file = os.path.join(size_dir, '二手车清洗结果.csv')
+
+    stages = {}
+    print(f"\n[{label}] 生成 {n_rows} 行模拟数据...")
+    _, stages['generate'] = measure(generate_crawl_csv, raw_file, n_rows, seed)
+    stages['generate']['file_mb'] = round(os.path.getsize(raw_file) / 2 ** 20, 1)
+
+    print(f"[{label}] clean_used_car_data...")
+    ok, stages['clean'] = measure(clean_used_car_data, raw_file, cleaned_file)
+    if not ok:
+        raise RuntimeError(f"{label} 数据清洗失败")
+    df = pd.read_csv(cleaned_file)
+    stages['clean']['rows_out'] = len(df)
+
+    print(f"[{label}] 后续过滤...")
+    df, stages['postprocess'] = measure(postprocess_cleaned_data, df)
+    stages['postprocess']['rows_out'] = len(df)
+
+    print(f"[{label}] 图表聚合...")
+    _, stages['chart_aggregation'] = measure(_chart_aggregations, df)
+
+    print(f"[{label}] 特征存储与模型训练...")
+    store = FeatureStore(os.path.join(size_dir, '特征存储'))
+    _, stages['feature_store'] = measure(store.sync, df)
+    bundle, stages['train'] = measure(_train, store)
+    stages['train']['backend'] = bundle['backend']
+    stages['train']['rmse'] = round(bundle['metrics']['rmse'], 3)
+
+    for stage, result in stages.items():
+        peak = '-' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.1f} MB"
+        print(f"  {stage:<18} {result['seconds']:>9.2f} 秒  内存峰值 {peak:>10}")
+    return {'rows': n_rows, 'stages': stages}
+
+
+def compare_reports(current, baseline, threshold=0.1):
+    """打印与基线报告的耗时对比，返回变慢超过 threshold 的阶段列表"""
+    regressions = []
+    print("\n与基线对比（耗时比值 = 本次 / 基线）:")
+    for label, result in current['sizes'].items():
+        base = baseline.get('sizes', {}).get(label)
+        if not base:
+            continue
+        for stage, stats in result['stages'].items():
+            base_stats = base['stages'].get(stage)
+            if not base_stats or not base_stats['seconds']:
+                continue
+            ratio = stats['seconds'] / base_stats['seconds']
+            flag = '  <-- 变慢' if ratio > 1 + threshold else ''
+            print(f"  [{label}] {stage:<18} {ratio:6.2f}x{flag}")
+            if flag:
+                regressions.append((label, stage, ratio))
+    return regressions
+
+
+def main(sizes=('10k',), workdir=DEFAULT_WORKDIR, output=None, baseline=None, keep_data=False, seed=42):
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'seed': seed,
+        'sizes': {},
+    }
+    try:
+        for label in sizes:
+            n_rows = DATASET_SIZES.get(label.lower()) or int(label)
+            report['sizes'][label] = run_size(label, n_rows, workdir, seed)
+    finally:
+        if not keep_data:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = output or os.path.join(DEFAULT_REPORT_DIR, f"report_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n测试报告已保存到: {output}")
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            compare_reports(report, json.load(f))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='预处理与分析流程的性能测试')
+    parser.add_argument('--sizes', default='10k', help='逗号分隔的数据规模：10k、1m、10m 或具体行数')
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR, help='模拟数据的临时目录')
+    parser.add_argument('--output', default=None, help='JSON 报告路径，默认 benchmarks/report_<时间>.json')
+    parser.add_argument('--baseline', default=None, help='用于对比的历史 JSON 报告')
+    parser.add_argument('--keep-data', action='store_true', help='保留生成的模拟数据')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    main(sizes=[size.strip() for size in args.sizes.split(',') if size.strip()], workdir=args.workdir,
+         output=args.output, baseline=args.baseline, keep_data=args.keep_data, seed=args.seed)
@@ -1,151 +1,289 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
 
-import os
+from 数据聚合 import DEFAULT_CUBE_FILE, PriceCube
+
+IMAGE_DIR = './images'
+DATA_FILE = './datas/二手车预处理结果.csv'
+
+# 散点图超过该点数后改为分层抽样或密度图，保证绘图时间不随数据量增长
+SCATTER_MAX_POINTS = 50000
+# 分层抽样时每个车辆级别至少保留的点数，避免小类别在图中消失
+SCATTER_MIN_PER_GROUP = 200
+
+# 可单独生成的图表：价格-里程散点、年份箱线图、品牌均价、级别小提琴图、特征重要性
+CHART_NAMES = ['scatter', 'year', 'brand', 'level', 'importance']
+
+
+def setup_style():
+    """设置中文字体和图表风格（批量模式下每个子进程都需要调用一次）"""
+    # 设置中文字体，确保图片中的中文正常显示
+    plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
+    plt.rcParams['axes.unicode_minus'] = False
 
-os.makedirs('images',exist_ok=True)
+    # 设置图表风格
+    plt.style.use('seaborn-v0_8-whitegrid')
+    custom_palette = sns.color_palette("Set2", 10)
+    sns.set(font="Microsoft YaHei", palette=custom_palette)
 
-# 设置中文字体，确保图片中的中文正常显示
-plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
 
-# 设置图表风格
-plt.style.use('seaborn-v0_8-whitegrid')
-custom_palette = sns.color_palette("Set2", 10)
-sns.set(font="Microsoft YaHei", palette=custom_palette)
+def _save_figure(filename, show):
+    plt.tight_layout()
+    path = os.path.join(IMAGE_DIR, filename)
+    plt.savefig(path, dpi=150)
+    if show:
+        plt.show()
+    plt.close()
+    return path
 
-# 读取数据
-df = pd.read_csv("./datas/二手车预处理结果.csv")
 
-# 选择分析所需的字段并去除缺失值
-df_viz = df[['价格_万', '里程_万公里', '上牌年份', '品牌', '车辆级别']].dropna()
+def stratified_sample(df, by, max_points=SCATTER_MAX_POINTS, min_per_group=SCATTER_MIN_PER_GROUP, random_state=42):
+    """按 by 列分层抽样到约 max_points 行，各层按比例抽取且不少于 min_per_group 行"""
+    if len(df) <= max_points:
+        return df
+    rng = np.random.default_rng(random_state)
+    shuffled = df.iloc[rng.permutation(len(df))]
+    sizes = shuffled.groupby(by).size()
+    quota = np.maximum((sizes * max_points / len(df)).round(), min_per_group).clip(upper=sizes)
+    rank = shuffled.groupby(by).cumcount()
+    return shuffled[rank.to_numpy() < shuffled[by].map(quota).to_numpy()]
+
+
+def prepare_scatter_data(df_viz, mode='auto', max_points=SCATTER_MAX_POINTS, bins=120):
+    """
+    为图1准备绘图数据，返回 (模式, 数据)。
+    - 'full': 点数不超过 max_points 时原样绘制全部散点；
+    - 'sample': 按车辆级别分层抽样后绘制散点；
+    - 'density': 预先计算二维直方图，只把分箱计数交给绘图进程。
+    mode='auto' 时数据量小于 max_points 用 'full'，否则用 'sample'。
+    """
+    if mode == 'auto':
+        mode = 'full' if len(df_viz) <= max_points else 'sample'
+    if mode == 'full':
+        return mode, df_viz[['里程_万公里', '价格_万', '车辆级别']]
+    if mode == 'sample':
+        return mode, stratified_sample(df_viz[['里程_万公里', '价格_万', '车辆级别']], '车辆级别', max_points)
+    if mode == 'density':
+        x = df_viz['里程_万公里'].to_numpy(dtype='float64')
+        y = df_viz['价格_万'].to_numpy(dtype='float64')
+        y_max = np.quantile(y, 0.995) if len(y) else 1.0
+        counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, range=[[0, x.max() if len(x) else 1.0], [0, y_max]])
+        return mode, {'counts': counts, 'x_edges': x_edges, 'y_edges': y_edges, 'n': len(x)}
+    raise ValueError(f"未知的散点图模式: {mode}")
+
 
 # 图1：价格 vs. 行驶里程（按车辆级别区分）
-plt.figure(figsize=(8, 6))
-sns.scatterplot(
-    data=df_viz, x='里程_万公里', y='价格_万', hue='车辆级别', palette='tab20', s=80, edgecolor='k', alpha=0.8
-)
-plt.title('价格 vs. 行驶里程', fontsize=16, fontweight='bold')
-plt.xlabel('行驶里程（万公里）', fontsize=13)
-plt.ylabel('价格（万元）', fontsize=13)
-plt.legend(title='车辆级别', bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.grid(linestyle='--', alpha=0.5)
-plt.tight_layout()
-plt.savefig('./images/价格_vs_行驶里程.png', dpi=150)
-plt.show()
+def plot_price_vs_mileage(scatter_data, show=False):
+    mode, data = scatter_data
+    plt.figure(figsize=(8, 6))
+    if mode == 'density':
+        plt.pcolormesh(data['x_edges'], data['y_edges'], np.ma.masked_equal(data['counts'].T, 0),
+                       cmap='viridis', norm=LogNorm())
+        plt.colorbar(label='车辆数')
+        plt.title(f'价格 vs. 行驶里程（密度图，n={data["n"]}）', fontsize=16, fontweight='bold')
+    else:
+        if mode == 'full':
+            sns.scatterplot(
+                data=data, x='里程_万公里', y='价格_万', hue='车辆级别', palette='tab20', s=80, edgecolor='k', alpha=0.8
+            )
+            plt.title('价格 vs. 行驶里程', fontsize=16, fontweight='bold')
+        else:
+            # 抽样后点仍然较多，去掉描边以降低绘制开销
+            sns.scatterplot(
+                data=data, x='里程_万公里', y='价格_万', hue='车辆级别', palette='tab20', s=20, linewidth=0, alpha=0.6
+            )
+            plt.title(f'价格 vs. 行驶里程（分层抽样 {len(data)} 条）', fontsize=16, fontweight='bold')
+        plt.legend(title='车辆级别', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.xlabel('行驶里程（万公里）', fontsize=13)
+    plt.ylabel('价格（万元）', fontsize=13)
+    plt.grid(linestyle='--', alpha=0.5)
+    return _save_figure('价格_vs_行驶里程.png', show)
+
 
 # 图2：不同上牌年份的价格分布（箱线图）
-plt.figure(figsize=(11, 6))
-sns.boxplot(data=df_viz, x='上牌年份', y='价格_万', width=0.6, fliersize=2, linewidth=1.5, boxprops=dict(alpha=0.7))
-plt.title('不同上牌年份的价格分布', fontsize=16, fontweight='bold')
-plt.xlabel('上牌年份', fontsize=13)
-plt.ylabel('价格（万元）', fontsize=13)
-plt.xticks(rotation=45)
-plt.grid(axis='y', linestyle=':', alpha=0.4)
-plt.tight_layout()
-plt.savefig('./images/上牌年份_价格分布.png', dpi=150)
-plt.show()
+def plot_year_price_distribution(year_stats, show=False):
+    """year_stats 为 PriceCube.boxplot_stats('上牌年份') 的结果"""
+    plt.figure(figsize=(11, 6))
+    bp = plt.gca().bxp(year_stats, widths=0.6, patch_artist=True, showfliers=False,
+                       boxprops=dict(linewidth=1.5), whiskerprops=dict(linewidth=1.5),
+                       capprops=dict(linewidth=1.5), medianprops=dict(linewidth=1.5, color='k'))
+    for patch, color in zip(bp['boxes'], sns.color_palette(n_colors=len(year_stats))):
+        patch.set_facecolor(color)
+        patch.set_alpha(0.7)
+    plt.title('不同上牌年份的价格分布', fontsize=16, fontweight='bold')
+    plt.xlabel('上牌年份', fontsize=13)
+    plt.ylabel('价格（万元）', fontsize=13)
+    plt.xticks(rotation=45)
+    plt.grid(axis='y', linestyle=':', alpha=0.4)
+    return _save_figure('上牌年份_价格分布.png', show)
+
 
 # 图3：品牌平均价格（前15）
-plt.figure(figsize=(10, 8))
-brand_price = df_viz.groupby('品牌')['价格_万'].mean().sort_values(ascending=False).head(15)
-sns.barplot(
-    x=brand_price.values, y=brand_price.index,
-    palette='Spectral',
-    edgecolor='k',
-    hue=brand_price.index,
-    legend=False
-)
-plt.title('品牌平均价格（前15）', fontsize=16, fontweight='bold')
-plt.xlabel('平均价格（万元）', fontsize=13)
-plt.ylabel('品牌', fontsize=13)
-for i, v in enumerate(brand_price.values):
-    plt.text(v + 0.2, i, f'{v:.1f}', va='center', fontsize=11, color='black')
-plt.tight_layout()
-plt.savefig('./images/品牌平均价格前15.png', dpi=150)
-plt.show()
+def plot_brand_top15(brand_price, show=False):
+    """brand_price 为按均价降序排列的前15个品牌的平均价格"""
+    plt.figure(figsize=(10, 8))
+    sns.barplot(
+        x=brand_price.values, y=brand_price.index,
+        palette='Spectral',
+        edgecolor='k',
+        hue=brand_price.index,
+        legend=False
+    )
+    plt.title('品牌平均价格（前15）', fontsize=16, fontweight='bold')
+    plt.xlabel('平均价格（万元）', fontsize=13)
+    plt.ylabel('品牌', fontsize=13)
+    for i, v in enumerate(brand_price.values):
+        plt.text(v + 0.2, i, f'{v:.1f}', va='center', fontsize=11, color='black')
+    return _save_figure('品牌平均价格前15.png', show)
+
 
 # 图4：不同车辆级别的价格分布（小提琴图）
-plt.figure(figsize=(10, 6))
-sns.violinplot(
-    data=df_viz, x='车辆级别', y='价格_万',
-    palette='Pastel2',
-    inner='quartile',
-    linewidth=1.2,
-    hue=df_viz['车辆级别'],
-    legend=False
-)
-plt.title('不同车辆级别的价格分布', fontsize=16, fontweight='bold')
-plt.xlabel('车辆级别', fontsize=13)
-plt.ylabel('价格（万元）', fontsize=13)
-plt.xticks(rotation=30)
-plt.grid(axis='y', linestyle=':', alpha=0.4)
-plt.tight_layout()
-plt.savefig('./images/车辆级别_价格分布.png', dpi=150)
-plt.show()
+def plot_level_price_distribution(level_stats, show=False):
+    """level_stats 为 PriceCube.violin_stats('车辆级别') 的结果"""
+    plt.figure(figsize=(10, 6))
+    positions = range(len(level_stats))
+    parts = plt.gca().violin(level_stats, positions=positions, widths=0.8, showextrema=False)
+    for body, color in zip(parts['bodies'], sns.color_palette('Pastel2', len(level_stats))):
+        body.set_facecolor(color)
+        body.set_edgecolor('k')
+        body.set_linewidth(1.2)
+        body.set_alpha(1)
+    for pos, stats in zip(positions, level_stats):
+        for q, style in zip(stats['quartiles'], ['--', '-', '--']):
+            plt.hlines(q, pos - 0.2, pos + 0.2, colors='k', linestyles=style, linewidth=1.2)
+    plt.xticks(positions, [stats['label'] for stats in level_stats])
+    plt.title('不同车辆级别的价格分布', fontsize=16, fontweight='bold')
+    plt.xlabel('车辆级别', fontsize=13)
+    plt.ylabel('价格（万元）', fontsize=13)
+    plt.xticks(rotation=30)
+    plt.grid(axis='y', linestyle=':', alpha=0.4)
+    return _save_figure('车辆级别_价格分布.png', show)
+
 
 # ------------------- 机器学习特征重要性分析 -------------------
 
-# 选择相关特征
-features = ['里程_万公里', '上牌年份', '品牌', '车辆级别']
-target = '价格_万'
-
-# 丢弃缺失值
-df_ml = df[features + [target]].dropna()
-
-# 编码分类特征
-df_encoded = df_ml.copy()
-label_encoders = {}
-for col in ['品牌', '车辆级别']:
-    le = LabelEncoder()
-    df_encoded[col] = le.fit_transform(df_ml[col])
-    label_encoders[col] = le
-
-# 分割数据集
-X = df_encoded[features]
-y = df_encoded[target]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# 模型训练：随机森林
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# 模型评估
-y_pred = model.predict(X_test)
-mse = mean_squared_error(y_test, y_pred)
-rmse = mse ** 0.5
-r2 = r2_score(y_test, y_pred)
-
-print(f"模型评估结果：")
-print(f"  RMSE 均方根误差: {rmse:.2f} 万元")
-print(f"  R² 决定系数: {r2:.2f}")
-
-# 特征重要性可视化
-importances = model.feature_importances_
-feature_names = X.columns
-feature_importance_df = pd.DataFrame({
-    '特征': feature_names,
-    '重要性': importances
-}).sort_values(by='重要性', ascending=False)
-
-plt.figure(figsize=(8, 6))
-sns.barplot(
-    x='重要性', y='特征', data=feature_importance_df,
-    palette="Oranges",
-    edgecolor='k',
-    hue='特征',
-    legend=False
-)
-plt.title('影响二手车价格的重要因素', fontsize=16, fontweight='bold')
-plt.xlabel('特征重要性', fontsize=13)
-plt.ylabel('特征', fontsize=13)
-for i, v in enumerate(feature_importance_df['重要性']):
-    plt.text(v + 0.01, i, f'{v:.2f}', va='center', fontsize=11, color='black')
-plt.tight_layout()
-plt.savefig('./images/特征重要性分析.png', dpi=150)
-plt.show()
\ No newline at end of file
+def train_price_model(df, backend='auto'):
+    """训练（或复用已保存的）价格模型，返回特征重要性表"""
+    # scikit-learn 只在需要特征重要性图时才导入
+    from 模型训练 import print_metrics, train_or_load_model
+    from 特征存储 import FeatureStore
+
+    if df is None and FeatureStore().latest_version is None:
+        # 特征存储为空时才回退到读取预处理结果文件
+        df = pd.read_csv(DATA_FILE)
+    bundle = train_or_load_model(df, backend=backend)
+    print_metrics(bundle['metrics'])
+    return bundle['feature_importance']
+
+
+# 图5：特征重要性
+def plot_feature_importance(feature_importance_df, show=False):
+    plt.figure(figsize=(8, 6))
+    sns.barplot(
+        x='重要性', y='特征', data=feature_importance_df,
+        palette="Oranges",
+        edgecolor='k',
+        hue='特征',
+        legend=False
+    )
+    plt.title('影响二手车价格的重要因素', fontsize=16, fontweight='bold')
+    plt.xlabel('特征重要性', fontsize=13)
+    plt.ylabel('特征', fontsize=13)
+    for i, v in enumerate(feature_importance_df['重要性']):
+        plt.text(v + 0.01, i, f'{v:.2f}', va='center', fontsize=11, color='black')
+    return _save_figure('特征重要性分析.png', show)
+
+
+def _init_render_worker():
+    # 子进程只做离屏渲染，强制使用 Agg 后端
+    matplotlib.use('Agg', force=True)
+    setup_style()
+
+
+def _render_chart(plot_func, kwargs):
+    return plot_func(**kwargs, show=False)
+
+
+def main(batch=False, scatter_mode='auto', workers=None, backend='auto', df=None, charts=None):
+    """
+    生成图表。
+    batch=False 时按顺序绘制并逐个弹出窗口；
+    batch=True 时使用 Agg 后端离屏渲染，各图在多个子进程中并行绘制，不会阻塞在 plt.show()。
+    df 为空时读取预处理结果文件；charts 为 CHART_NAMES 中的若干项，为空时生成全部图表。
+    """
+    charts = list(charts) if charts else CHART_NAMES
+    unknown = [name for name in charts if name not in CHART_NAMES]
+    if unknown:
+        raise ValueError(f"未知的图表: {unknown}，可选: {CHART_NAMES}")
+
+    if batch:
+        plt.switch_backend('Agg')
+    setup_style()
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+
+    def load_data():
+        # 只在确实需要明细数据的图表中读取
+        nonlocal df
+        if df is None:
+            df = pd.read_csv(DATA_FILE)
+        return df
+
+    # 主进程先把各图表需要的数据压缩成抽样点或统计量，子进程只接收这些结果，传输量与数据总量无关
+    chart_jobs = []
+    if 'scatter' in charts:
+        # 选择分析所需的字段并去除缺失值
+        df_viz = load_data()[['价格_万', '里程_万公里', '上牌年份', '品牌', '车辆级别']].dropna()
+        chart_jobs.append((plot_price_vs_mileage, {'scatter_data': prepare_scatter_data(df_viz, scatter_mode)}))
+    if any(name in charts for name in ('year', 'brand', 'level')):
+        # 传入了 df 时从 df 建立立方体，保证所有图表来自同一份数据；
+        # 否则直接读取预处理阶段同步好的聚合立方体，不再重复扫描原始数据
+        if df is None and os.path.exists(DEFAULT_CUBE_FILE):
+            cube = PriceCube.load(DEFAULT_CUBE_FILE, with_listings=False)
+        else:
+            cube = PriceCube.from_frame(load_data())
+        if 'year' in charts:
+            chart_jobs.append((plot_year_price_distribution, {'year_stats': cube.boxplot_stats('上牌年份')}))
+        if 'brand' in charts:
+            brand_price = cube.rollup('品牌')['平均价格'].sort_values(ascending=False).head(15)
+            chart_jobs.append((plot_brand_top15, {'brand_price': brand_price}))
+        if 'level' in charts:
+            chart_jobs.append((plot_level_price_distribution, {'level_stats': cube.violin_stats('车辆级别')}))
+
+    if not batch:
+        for plot_func, kwargs in chart_jobs:
+            plot_func(**kwargs, show=True)
+        if 'importance' in charts:
+            plot_feature_importance(train_price_model(df, backend), show=True)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers or min(len(charts), os.cpu_count() or 1),
+                             initializer=_init_render_worker) as pool:
+        futures = [pool.submit(_render_chart, plot_func, kwargs) for plot_func, kwargs in chart_jobs]
+        if 'importance' in charts:
+            # 子进程绘图的同时在主进程训练模型
+            feature_importance_df = train_price_model(df, backend)
+            futures.append(pool.submit(_render_chart, plot_feature_importance,
+                                       {'feature_importance_df': feature_importance_df}))
+        for future in futures:
+            print(f"图表已保存: {future.result()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='二手车数据可视化')
+    parser.add_argument('--batch', action='store_true', help='批量模式：Agg 后端离屏渲染，多进程并行生成图表')
+    parser.add_argument('--scatter-mode', choices=['auto', 'full', 'sample', 'density'], default='auto',
+                        help='价格 vs. 里程图的绘制方式，大数据量时自动分层抽样')
+    parser.add_argument('--workers', type=int, default=None, help='批量模式下的绘图进程数')
+    parser.add_argument('--backend', choices=['auto', 'rf', 'hgb'], default='auto', help='价格模型类型')
+    parser.add_argument('--charts', default=None, help=f"逗号分隔的图表名称，可选: {','.join(CHART_NAMES)}")
+    args = parser.parse_args()
+    main(batch=args.batch, scatter_mode=args.scatter_mode, workers=args.workers, backend=args.backend,
+         charts=args.charts.split(',') if args.charts else None)
@@ -6,18 +6,24 @@ import random
 import re
 import os
 
-os.makedirs('datas',exist_ok=True)
+from 文本清洗 import clean_text, clean_texts
 
-def clean_text(text):
-    """清洗文本，去除不可见字符和常见乱码"""
-    if not isinstance(text, str):
-        return text
-    # 去除不可见字符、全角空格、特殊乱码符号
-    text = text.replace('\u3000', '').replace('\xa0', '').replace('\u200b', '')
-    text = re.sub(r'[\r\n\t]', '', text)
-    text = re.sub(r'[^\x00-\x7F\u4e00-\u9fff，。！？、（）【】《》“”‘’：；]', '', text)
-    return text.strip()
+os.makedirs('datas',exist_ok=True)
 
+# 不限页数爬取时每个城市最多翻的页数，防止始终识别不到最后一页时无限翻页
+MAX_PAGES = 100
+
+# CSV 字段顺序，包含留言信息
+CSV_FIELDS = [
+    "列表_车名", "列表_价格(万)", "列表_里程(万公里)", "列表_上牌时间", "车辆ID",
+    "经销商ID", "城市", "页码", "详情URL", "车辆名称", "价格(万)", "表显里程", "上牌时间",
+    "挡位排量", "车辆所在地", "档案_上牌时间", "档案_表显里程", "变速箱",
+    "排放标准", "排量", "发布时间", "年检到期", "保险到期", "质保到期",
+    "过户次数", "档案_所在地", "发动机", "车辆级别", "车身颜色", "燃油标号", "驱动方式",
+    "留言信息", "留言_车辆名称", "留言_驱动方式", "留言_颜色", "留言_出厂时间",
+    "留言_交强日期", "留言_行驶里程", "留言_车辆排量", "留言_车辆状态",
+    "留言_钥匙", "留言_车况", "留言_车辆配置"
+]
 
 def parse_cookies(cookie_str):
     """将cookie字符串转换为字典形式"""
@@ -229,26 +235,15 @@ def save_to_csv(car_data, filename=".河南二手车详细数据.csv"):
         print("没有数据可保存")
         return
 
-    # 扩展字段顺序，包含留言信息
-    fields = [
-        "列表_车名", "列表_价格(万)", "列表_里程(万公里)", "列表_上牌时间", "车辆ID",
-        "经销商ID", "城市", "页码", "详情URL", "车辆名称", "价格(万)", "表显里程", "上牌时间",
-        "挡位排量", "车辆所在地", "档案_上牌时间", "档案_表显里程", "变速箱",
-        "排放标准", "排量", "发布时间", "年检到期", "保险到期", "质保到期",
-        "过户次数", "档案_所在地", "发动机", "车辆级别", "车身颜色", "燃油标号", "驱动方式",
-        "留言信息", "留言_车辆名称", "留言_驱动方式", "留言_颜色", "留言_出厂时间",
-        "留言_交强日期", "留言_行驶里程", "留言_车辆排量", "留言_车辆状态",
-        "留言_钥匙", "留言_车况", "留言_车辆配置"
-    ]
-
     try:
-        # 对所有数据做清洗
+        # 对所有数据做清洗：所有单元格一次性批量清洗，城市、级别等重复取值只处理一次
+        cleaned = iter(clean_texts([value for row in car_data for value in row.values()]))
         for row in car_data:
             for k in row:
-                row[k] = clean_text(row[k])
+                row[k] = next(cleaned)
         # 保存时使用 utf-8-sig 防止 Excel 打开乱码
         with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=fields)
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
             writer.writeheader()
             writer.writerows(car_data)
         print(f"数据已保存至 {filename}")
@@ -317,7 +312,13 @@ def get_city_url(city_pinyin, page):
             return f'https://www.che168.com/{city_pinyin}/a0_0msdgscncgpi1ltocsp{page}exx0/?pvareaid=102179'
 
 
-def main():
+def main(cities=None, pages=5, filename=".河南二手车详细数据.csv"):
+    """
+    爬取二手车数据并保存为 CSV，返回爬取到的车辆列表。
+    cities 为要爬取的城市名或拼音列表，为空时爬取全部省会城市；
+    pages 为每个城市爬取的页数，为 0 或 None 时一直翻到最后一页（最多 MAX_PAGES 页）。
+    快照历史只在翻到了最后一页的城市内把消失的车源记为下架；不限城市且每个城市都翻到最后一页时按全量爬取记录。
+    """
     # 请求头设置
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36',
@@ -332,16 +333,22 @@ def main():
     cookies = parse_cookies(cookie_str)
 
     all_cars = []
-    cities = get_province_capitals()  # 只爬取省会城市
+    capitals = get_province_capitals()  # 只爬取省会城市
+    if cities:
+        capitals = [city for city in capitals if city["name"] in cities or city["pinyin"] in cities]
+
+    # 翻到了最后一页且没有失败页面的城市，快照历史只在这些城市内判断车源是否下架
+    complete_cities = []
 
     # 遍历每个省会城市
-    for city in cities:
+    for city in capitals:
         city_name = city["name"]
         city_pinyin = city["pinyin"]
+        reached_last_page, page_failed = False, False
 
         print(f"\n开始爬取{city_name}的二手车详细数据...")
 
-        for page in range(1, 6):  # 每个城市只爬取5页
+        for page in range(1, (pages or MAX_PAGES) + 1):  # 每个城市默认只爬取5页
             url = get_city_url(city_pinyin, page)
             print(f"正在爬取{city_name}第{page}页... URL: {url}")
 
@@ -349,13 +356,17 @@ def main():
             html = get_html(url, headers, cookies)
             if not html:
                 print("无法获取页面内容，跳过此页")
+                page_failed = True
                 continue
 
             # 解析车辆列表并获取详情
-            cars, _ = parse_car_list(html, city_name, page, headers, cookies)
+            cars, is_last_page = parse_car_list(html, city_name, page, headers, cookies)
+            reached_last_page = reached_last_page or is_last_page
             if cars:
                 all_cars.extend(cars)
                 print(f"第{page}页获取到{len(cars)}条详细数据")
+            if is_last_page and not pages:
+                break
 
             # 更新cookie中的某些值
             cookies['v_no'] = str(int(cookies.get('v_no', '7')) + 1)
@@ -366,6 +377,9 @@ def main():
             print(f"等待 {sleep_time:.2f} 秒后继续...")
             time.sleep(sleep_time)
 
+        if reached_last_page and not page_failed:
+            complete_cities.append(city_name)
+
         # 城市间更长的延迟
         city_sleep = 5 + random.random() * 5
         print(f"完成{city_name}的爬取，等待{city_sleep:.2f}秒后继续下一个城市...")
@@ -385,7 +399,20 @@ def main():
         print(f"{city}: {count}条数据")
 
     # 保存数据到CSV
-    save_to_csv(all_cars)
+    save_to_csv(all_cars, filename)
+    if all_cars:
+        # CSV 每次都会被覆盖，同时把本次结果记入快照历史，保留车源的上下架和调价记录
+        from 快照历史 import record_snapshot
+        if not cities and len(complete_cities) == len(capitals):
+            scope = None  # 全部城市都完整翻到了最后一页，按全量爬取判断下架
+        else:
+            scope = {
+                'cities': [city["name"] for city in capitals],
+                'pages': pages,
+                'complete_cities': complete_cities,
+            }
+        record_snapshot(all_cars, scope=scope)
+    return all_cars
 
 
 if __name__ == "__main__":
@@ -0,0 +1,251 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# 聚合立方体的维度和度量
+CUBE_DIMENSIONS = ['品牌', '车辆级别', '上牌年份', '城市']
+CUBE_MEASURE = '价格_万'
+DEFAULT_CUBE_FILE = 'datas/二手车聚合立方体.pkl'
+
+# 价格直方图的分桶边界（万元），按对数均匀划分，最后一个桶向上开放
+PRICE_BIN_EDGES = np.concatenate(([0.0], np.geomspace(0.5, 1000, 127)))
+N_PRICE_BINS = len(PRICE_BIN_EDGES)
+HIST_COLUMNS = [f'h{i:03d}' for i in range(N_PRICE_BINS)]
+STAT_COLUMNS = ['count', 'sum', 'sumsq', 'min', 'max']
+ADDITIVE_COLUMNS = ['count', 'sum', 'sumsq'] + HIST_COLUMNS
+
+
+def _empty_cells():
+    index = pd.MultiIndex.from_arrays([[] for _ in CUBE_DIMENSIONS], names=CUBE_DIMENSIONS)
+    return pd.DataFrame(columns=STAT_COLUMNS + HIST_COLUMNS, index=index, dtype='float64')
+
+
+def _combine_cells(cells, levels):
+    """按给定索引层合并立方体单元，计数/求和/直方图相加，最值取极值"""
+    grouped = cells.groupby(level=levels, sort=True)
+    combined = grouped[ADDITIVE_COLUMNS].sum()
+    combined['min'] = grouped['min'].min()
+    combined['max'] = grouped['max'].max()
+    return combined[STAT_COLUMNS + HIST_COLUMNS]
+
+
+def _histogram_quantiles(cells, qs):
+    """根据每个单元的直方图估算分位数，结果再限制在该单元的 [min, max] 内"""
+    hist = cells[HIST_COLUMNS].to_numpy(dtype='float64')
+    counts = hist.sum(axis=1)
+    cum = hist.cumsum(axis=1)
+    lower_edges = PRICE_BIN_EDGES
+    upper_edges = np.append(PRICE_BIN_EDGES[1:], np.inf)
+    rows = np.arange(len(cells))
+    result = {}
+    for q in qs:
+        target = q * counts
+        bin_idx = (cum >= target[:, None]).argmax(axis=1)
+        before = np.where(bin_idx > 0, cum[rows, np.maximum(bin_idx - 1, 0)], 0.0)
+        in_bin = hist[rows, bin_idx]
+        frac = np.divide(target - before, in_bin, out=np.zeros_like(target), where=in_bin > 0)
+        lo = np.maximum(lower_edges[bin_idx], cells['min'].to_numpy())
+        hi = np.minimum(upper_edges[bin_idx], cells['max'].to_numpy())
+        hi = np.maximum(hi, lo)
+        result[q] = lo + frac * (hi - lo)
+    return pd.DataFrame(result, index=cells.index)
+
+
+def _cell_stats(listings):
+    """把车源明细聚合成立方体单元：计数、求和、平方和、最值和价格直方图"""
+    if listings.empty:
+        return _empty_cells()
+    price = listings[CUBE_MEASURE].to_numpy(dtype='float64')
+    grouped = pd.DataFrame({'price': price, 'sq': price * price}, index=listings.index)
+    gb = grouped.groupby([listings[col].to_numpy() for col in CUBE_DIMENSIONS], sort=True)
+    partial = gb['price'].agg(['count', 'sum', 'min', 'max'])
+    partial['sumsq'] = gb['sq'].sum()
+
+    # 直方图：单元编号 * 桶数 + 桶编号，一次 bincount 完成计数
+    cell_codes = gb.ngroup().to_numpy()
+    bins = np.clip(np.searchsorted(PRICE_BIN_EDGES, price, side='right') - 1, 0, N_PRICE_BINS - 1)
+    hist = np.bincount(cell_codes * N_PRICE_BINS + bins, minlength=len(partial) * N_PRICE_BINS)
+    hist = pd.DataFrame(hist.reshape(len(partial), N_PRICE_BINS), index=partial.index, columns=HIST_COLUMNS)
+    partial = pd.concat([partial[STAT_COLUMNS].astype('float64'), hist.astype('float64')], axis=1)
+    partial.index.names = CUBE_DIMENSIONS
+    return partial
+
+
+def _prepare_listings(df):
+    """取出立方体需要的列，以车辆ID为索引（没有车辆ID时按行号），同一车辆只保留最后一条"""
+    columns = CUBE_DIMENSIONS + [CUBE_MEASURE] + (['车辆ID'] if '车辆ID' in df.columns else [])
+    data = df[columns].dropna(subset=CUBE_DIMENSIONS + [CUBE_MEASURE])
+    if '车辆ID' not in data.columns:
+        ids = np.arange(len(data))
+    elif pd.api.types.is_integer_dtype(data['车辆ID']):
+        # 整数ID直接按 int64 哈希，比按字符串快得多
+        ids = data['车辆ID'].to_numpy(dtype='int64')
+    else:
+        ids = data['车辆ID'].astype(str).to_numpy(dtype=object)
+    codes, uniques = pd.factorize(ids)
+    last = np.empty(len(uniques), dtype='int64')
+    last[codes] = np.arange(len(ids))
+    keep = np.sort(last)
+    listings = pd.DataFrame({col: pd.Series(data[col].to_numpy(dtype=object)[keep], dtype=object)
+                             for col in ['品牌', '车辆级别', '城市']})
+    listings.index = pd.Index(ids[keep], name='车辆ID')
+    listings['上牌年份'] = data['上牌年份'].to_numpy(dtype='int64')[keep]
+    listings[CUBE_MEASURE] = data[CUBE_MEASURE].to_numpy(dtype='float64')[keep]
+    return listings[CUBE_DIMENSIONS + [CUBE_MEASURE]]
+
+
+class PriceCube:
+    """
+    二手车价格聚合立方体。
+    按 (品牌, 车辆级别, 上牌年份, 城市) 保存价格的计数、求和、平方和、最值以及对数分桶直方图，
+    并保留每辆车当前计入的维度和价格。每次用最新的全量数据同步时，只对新增、调价、下架的车源
+    撤回旧贡献、加入新贡献，图表直接从立方体取统计量，无需重新扫描原始数据。
+    """
+
+    def __init__(self, cells=None, listings=None):
+        self.cells = cells if cells is not None else _empty_cells()
+        # 每辆车当前计入立方体的维度和价格（以车辆ID为索引），车源变化时据此撤回旧贡献
+        self.listings = listings if listings is not None else _prepare_listings(
+            pd.DataFrame(columns=CUBE_DIMENSIONS + [CUBE_MEASURE]))
+
+    @classmethod
+    def from_frame(cls, df):
+        cube = cls()
+        cube.update(df)
+        return cube
+
+    def __len__(self):
+        return int(self.cells['count'].sum()) if not self.cells.empty else 0
+
+    def update(self, df):
+        """
+        以 df 作为当前的全量数据同步立方体：新车源加入，字段或价格变化的车源撤回旧值后加入新值，
+        df 中已不存在的车源被撤回。返回 (新增, 变化, 移除) 的车源数量。
+        """
+        if self.listings is None:
+            raise ValueError("该立方体是以 with_listings=False 读取的只读立方体，没有车源明细，不能同步数据")
+        new = _prepare_listings(df)
+        old = self.listings
+        # 新旧车辆ID一起做一次哈希编码，得到每辆新车源在旧明细中的位置（-1 表示新增）
+        old_ids, new_ids = old.index.to_numpy(), new.index.to_numpy()
+        if old_ids.dtype != new_ids.dtype:
+            old_ids, new_ids = old_ids.astype(str).astype(object), new_ids.astype(str).astype(object)
+        codes, uniques = pd.factorize(np.concatenate([old_ids, new_ids]))
+        old_pos = np.full(len(uniques), -1, dtype='int64')
+        old_pos[codes[:len(old)]] = np.arange(len(old))
+        indexer = old_pos[codes[len(old):]]
+        in_old = indexer >= 0
+        unchanged = in_old.copy()
+        for col in CUBE_DIMENSIONS + [CUBE_MEASURE]:
+            unchanged[in_old] &= old[col].to_numpy()[indexer[in_old]] == new[col].to_numpy()[in_old]
+        kept = np.zeros(len(old), dtype=bool)
+        kept[indexer[unchanged]] = True
+        retract = old[~kept]
+        contribute = new[~unchanged]
+        counts = (int((~in_old).sum()), int((in_old & ~unchanged).sum()), int(len(old) - in_old.sum()))
+        if retract.empty and contribute.empty:
+            return counts
+
+        # 只有新增贡献的单元直接相加；有车源撤回的单元用同步后的明细重新聚合，
+        # 避免对计数、平方和做减法带来的浮点误差，同时最值也能正确更新
+        touched = _cell_stats(retract).index
+        key = pd.MultiIndex.from_frame(new[CUBE_DIMENSIONS]) if len(touched) else None
+        rebuilt = _cell_stats(new[key.isin(touched)]) if len(touched) else _empty_cells()
+        contribute_cells = _cell_stats(contribute)
+        contribute_cells = contribute_cells[~contribute_cells.index.isin(touched)]
+        untouched = self.cells[~self.cells.index.isin(touched)]
+        self.cells = _combine_cells(pd.concat([untouched, contribute_cells, rebuilt]), CUBE_DIMENSIONS)
+        self.listings = new
+        return counts
+
+    def _group(self, by):
+        return _combine_cells(self.cells, by)
+
+    def rollup(self, by):
+        """按指定维度上卷，返回 数量/平均价格/标准差/最低价/最高价"""
+        g = self._group(by)
+        mean = g['sum'] / g['count']
+        var = (g['sumsq'] / g['count'] - mean ** 2).clip(lower=0) * g['count'] / (g['count'] - 1)
+        return pd.DataFrame({
+            '数量': g['count'].astype('int64'),
+            '平均价格': mean,
+            '标准差': np.sqrt(var),
+            '最低价': g['min'],
+            '最高价': g['max'],
+        })
+
+    def quantiles(self, by, qs=(0.25, 0.5, 0.75)):
+        """按指定维度估算价格分位数（基于直方图，误差在一个分桶宽度以内）"""
+        return _histogram_quantiles(self._group(by), qs)
+
+    def boxplot_stats(self, by):
+        """生成 matplotlib Axes.bxp 所需的箱线图统计量（不含离群点）"""
+        g = self._group(by)
+        q = _histogram_quantiles(g, (0.25, 0.5, 0.75))
+        stats = []
+        for key, row in q.iterrows():
+            q1, med, q3 = row[0.25], row[0.5], row[0.75]
+            iqr = q3 - q1
+            stats.append({
+                'label': key,
+                'q1': q1, 'med': med, 'q3': q3,
+                'whislo': max(g.at[key, 'min'], q1 - 1.5 * iqr),
+                'whishi': min(g.at[key, 'max'], q3 + 1.5 * iqr),
+                'fliers': [],
+            })
+        return stats
+
+    def violin_stats(self, by, points=100):
+        """生成 matplotlib Axes.violin 所需的统计量，密度由直方图插值得到"""
+        g = self._group(by)
+        q = _histogram_quantiles(g, (0.25, 0.5, 0.75))
+        widths = np.diff(np.append(PRICE_BIN_EDGES, PRICE_BIN_EDGES[-1] * 2))
+        centers = PRICE_BIN_EDGES + widths / 2
+        stats = []
+        for key, row in g.iterrows():
+            density = row[HIST_COLUMNS].to_numpy(dtype='float64') / widths / row['count']
+            # 相邻分桶做一次简单平滑，避免小样本时轮廓呈锯齿状
+            density = np.convolve(density, [1 / 9, 2 / 9, 3 / 9, 2 / 9, 1 / 9], mode='same')
+            coords = np.linspace(row['min'], row['max'], points)
+            vals = np.interp(coords, centers, density)
+            stats.append({
+                'label': key,
+                'coords': coords, 'vals': vals,
+                'mean': row['sum'] / row['count'],
+                'median': q.at[key, 0.5],
+                'min': row['min'], 'max': row['max'],
+                'quartiles': (q.at[key, 0.25], q.at[key, 0.5], q.at[key, 0.75]),
+            })
+        return stats
+
+    def save(self, path=DEFAULT_CUBE_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # 维度列以分类类型保存，明细表的体积与车源数成正比但远小于原始 CSV
+        listings = self.listings.astype({col: 'category' for col in ['品牌', '车辆级别', '城市']})
+        pd.to_pickle({'cells': self.cells, 'listings': listings}, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CUBE_FILE, with_listings=True):
+        """
+        读取已保存的立方体。只用于画图时可以 with_listings=False 跳过车源明细，
+        得到的是只读立方体：可以上卷和取统计量，调用 update() 会报错。
+        """
+        state = pd.read_pickle(path)
+        cube = cls(cells=state['cells'],
+                   listings=state['listings'].astype({col: object for col in ['品牌', '车辆级别', '城市']})
+                   if with_listings else None)
+        if not with_listings:
+            cube.listings = None
+        return cube
+
+
+def refresh_cube(df, path=DEFAULT_CUBE_FILE):
+    """读取已保存的立方体（不存在则新建），以 df 为当前全量数据同步后保存"""
+    cube = PriceCube.load(path) if os.path.exists(path) else PriceCube()
+    added, changed, removed = cube.update(df)
+    if added or changed or removed or not os.path.exists(path):
+        cube.save(path)
+    print(f"聚合立方体已更新，新增 {added} 辆，变化 {changed} 辆，移除 {removed} 辆，"
+          f"共 {len(cube)} 辆，{len(cube.cells)} 个单元")
+    return cube
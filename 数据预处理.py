@@ -3,6 +3,10 @@ import os
 import re
 import numpy as np  # 确保导入 numpy
 
+from 数据聚合 import refresh_cube
+from 文本清洗 import clean_text_series
+from 特征存储 import update_feature_store
+
 
 def extract_brand(car_name):
     """
@@ -33,23 +37,6 @@ def extract_brand(car_name):
 
 
 # --- 新增或修改的辅助函数 ---
-def clean_text_value(text):
-    """清洗单个文本数据，去除不可见字符和常见乱码，规范化空格"""
-    if not isinstance(text, str):
-        return text
-    text = text.replace('\u3000', ' ').replace('\xa0', ' ').replace('\u200b', ' ')
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^\w\s.,!?;:\'"()\[\]{}<>@#$%^&*\-_+=/\\|`~·！￥（）——【】《》？，。；：‘’“”€£¥]', '', text, flags=re.UNICODE)
-    return text.strip()
-
-
-def clean_text_series(series):
-    """对整个 Series 应用文本清理"""
-    if series is None or series.empty:
-        return series
-    return series.astype(str).apply(clean_text_value)
-
-
 def clean_price_value(price_str):
     if not isinstance(price_str, str):
         return np.nan
@@ -86,194 +73,212 @@ def parse_registration_date_value(date_str):
     return pd.NaT
 
 
+def clean_car_dataframe(df):
+    """对原始爬取数据做列合并、类型转换、文本清理和去重，返回清洗后的 DataFrame"""
+    # --- 开始重构的数据清洗和特征工程流程 ---
+    print("\n开始详细数据预处理...")
+
+    # 步骤 A: 初始列名清理和统一化 (例如，去除列名中的空格)
+    df.columns = df.columns.str.strip()
+    # 空字符串统一视为缺失值：无论数据来自 CSV 还是内存中的爬虫结果，列合并时的回退逻辑都相同
+    df = df.replace('', np.nan)
+
+    # 步骤 B: 合并相似列，优先使用更详细或可靠的来源
+    # (与 CarDataProcessor 中的逻辑类似)
+    df['车辆ID'] = df['车辆ID'].astype(str).replace('未知', np.nan)
+
+    # 合并价格，并重命名为 价格_万
+    df['价格_万'] = df['价格(万)'].combine_first(df['列表_价格(万)'])
+    if '价格(万)' in df.columns: df.drop(columns=['价格(万)'], inplace=True, errors='ignore')
+    if '列表_价格(万)' in df.columns: df.drop(columns=['列表_价格(万)'], inplace=True, errors='ignore')
+
+    # 合并里程，并重命名为 里程_万公里
+    df['里程_万公里'] = df['表显里程'].combine_first(df['列表_里程(万公里)']).combine_first(df['档案_表显里程'])
+    if '表显里程' in df.columns: df.drop(columns=['表显里程'], inplace=True, errors='ignore')
+    if '列表_里程(万公里)' in df.columns: df.drop(columns=['列表_里程(万公里)'], inplace=True, errors='ignore')
+    if '档案_表显里程' in df.columns: df.drop(columns=['档案_表显里程'], inplace=True, errors='ignore')
+
+    df['上牌时间_原始'] = df['上牌时间'].combine_first(df['列表_上牌时间']).combine_first(df['档案_上牌时间'])
+    if '上牌时间' in df.columns: df.drop(columns=['上牌时间'], inplace=True, errors='ignore')
+    if '列表_上牌时间' in df.columns: df.drop(columns=['列表_上牌时间'], inplace=True, errors='ignore')
+    if '档案_上牌时间' in df.columns: df.drop(columns=['档案_上牌时间'], inplace=True, errors='ignore')
+
+    # 合并车名，并重命名为 车名
+    df['车名'] = df['车辆名称'].combine_first(df['列表_车名'])
+    if '车辆名称' in df.columns: df.drop(columns=['车辆名称'], inplace=True, errors='ignore')
+    if '列表_车名' in df.columns: df.drop(columns=['列表_车名'], inplace=True, errors='ignore')
+
+    # 发动机信息也可能来自多个列，这里简化处理，假设原始 '发动机' 列存在
+
+    # 步骤 C: 提取品牌 (与原代码类似，但确保在列合并后)
+    if '车名' in df.columns:
+        df['品牌'] = df['车名'].apply(extract_brand)
+        # df['品牌'] = df['品牌'].replace('T', 'T-ROC探歌') # 此特定替换可能不再需要或需要调整
+        print("品牌提取完成。")
+    else:
+        df['品牌'] = np.nan
+        print("警告: '车名' 列不存在，无法提取品牌。")
+
+    # 步骤 D: 数据类型转换和特定列清洗
+    # 价格
+    if '价格_万' in df.columns:
+        df['价格_万'] = df['价格_万'].apply(clean_price_value)
+    # 里程
+    if '里程_万公里' in df.columns:
+        df['里程_万公里'] = df['里程_万公里'].apply(clean_mileage_value)
+    # 上牌时间 -> 年份和月份
+    if '上牌时间_原始' in df.columns:
+        parsed_dates = df['上牌时间_原始'].apply(parse_registration_date_value)
+        df['上牌年份'] = parsed_dates.dt.year.astype('Int64')
+        df['上牌月份'] = parsed_dates.dt.month.astype('Int64')
+        df.drop(columns=['上牌时间_原始'], inplace=True, errors='ignore')
+
+    # 挡位排量 -> 变速箱类型 (不再提取排量(L) 从这里)
+    if '挡位排量' in df.columns:
+        df['挡位排量_str'] = df['挡位排量'].astype(str)
+        df['变速箱类型'] = df['挡位排量_str'].apply(
+            lambda x: x.split('/')[0].strip() if isinstance(x, str) and '/' in x else x.strip() if isinstance(x,
+                                                                                                              str) else np.nan)
+        df.drop(columns=['挡位排量_str'], inplace=True, errors='ignore')
+        if '挡位排量' in df.columns: df.drop(columns=['挡位排量'], inplace=True, errors='ignore')
+
+    # 发动机信息解析
+    if '发动机' in df.columns:
+        df['发动机_str'] = df['发动机'].astype(str).str.upper()
+        displacement_pattern = r'(\d+\.\d+|\d+)\s*([TL])?'
+        displacement_matches = df['发动机_str'].str.extract(displacement_pattern)
+        df['排量_L'] = pd.to_numeric(displacement_matches[0], errors='coerce')  # 重命名为 排量_L
+
+        horsepower_pattern = r'(\d+)\s*(?:马力|PS)'
+        df['发动机马力_PS'] = df['发动机_str'].str.extract(horsepower_pattern, flags=re.IGNORECASE)[0]
+        df['发动机马力_PS'] = pd.to_numeric(df['发动机马力_PS'], errors='coerce').astype('Int64')
+
+        df.drop(columns=['发动机_str'], inplace=True, errors='ignore')
+        df.drop(columns=['发动机'], inplace=True, errors='ignore')  # 删除原始发动机列
+    else:  # 如果原始发动机列不存在，则创建空的派生列
+        df['排量_L'] = np.nan
+        df['发动机马力_PS'] = np.nan
+
+    # 过户次数
+    if '过户次数' in df.columns:
+        df['过户次数'] = df['过户次数'].astype(str).str.extract(r'(\d+)').iloc[:, 0]
+        df['过户次数'] = pd.to_numeric(df['过户次数'], errors='coerce').astype('Int64')
+
+    # 燃油标号 (与原代码类似，但确保在列合并和类型转换后)
+    if '燃油标号' in df.columns:
+        df = df[df['燃油标号'].astype(str).str.contains('92|95', na=False)]
+        print(f"燃油标号过滤后，剩余行数: {len(df)}")
+
+    # 步骤 E: 文本列统一清理
+    text_columns_to_clean = ['车名', '品牌', '城市', '经销商ID', '排放标准', '车辆级别',
+                             '车身颜色', '燃油标号', '驱动方式', '变速箱类型']
+    # '发动机进气形式', '发动机气缸排列' 已移除
+    for col in text_columns_to_clean:
+        if col in df.columns:
+            df[col] = clean_text_series(df[col])
+            df[col].replace('', np.nan, inplace=True)  # 清理后的空字符串转为NaN
+
+    # 步骤 F: 定义最终保留的列 (已更新列名和顺序)
+    final_columns_ordered = [
+        '车辆ID', '车名', '品牌', '城市',
+        '价格_万', '里程_万公里', '上牌年份', '上牌月份',
+        '变速箱类型', '排量_L', '发动机马力_PS',  # 更新为 排量_L
+        '排放标准', '过户次数', '车辆级别', '车身颜色',
+        '燃油标号', '驱动方式', '经销商ID'
+    ]
+    existing_final_columns = [col for col in final_columns_ordered if col in df.columns]
+    df_selected = df[existing_final_columns].copy()
+    print(f"\n选择最终列后，数据形状: {df_selected.shape}")
+    print(f"最终列: {df_selected.columns.tolist()}")
+
+    # 步骤 G: 去重和处理缺失值
+    # 移除无效车辆ID的行 (如果之前未完全处理)
+    df_selected.dropna(subset=['车辆ID'], inplace=True)
+    # 基于车辆ID去重
+    df_selected.sort_values(by=['车辆ID'], ascending=[True], inplace=True)  # 确保去重一致性
+    df_selected.drop_duplicates(subset=['车辆ID'], keep='first', inplace=True)
+    # 移除完全重复的行
+    df_selected.drop_duplicates(inplace=True)
+    print(f"去重后，数据形状: {df_selected.shape}")
+
+    # 移除在所有最终选定列上存在任何缺失值的行
+    # 特别注意，如果 extract_brand 返回 None (例如品牌为全英文或仅为"款")，品牌列会有 NaN，这一步会移除这些行
+    rows_before_final_dropna = len(df_selected)
+    df_cleaned = df_selected.dropna(subset=df_selected.columns)  # dropna on all columns of df_selected
+    rows_after_final_dropna = len(df_cleaned)
+    print(
+        f"移除所有列中含任何NaN的行后，数据形状: {df_cleaned.shape}. 移除了 {rows_before_final_dropna - rows_after_final_dropna} 行.")
+    return df_cleaned
+
+
+def save_cleaned_data(df_cleaned, output_file=os.path.join('datas', '二手车清洗结果.csv')):
+    # 步骤 H: 保存结果 (与原代码类似)
+    output_dir = os.path.dirname(output_file) or '.'
+    if len(df_cleaned) > 0:
+        os.makedirs(output_dir, exist_ok=True)
+        df_cleaned.to_csv(output_file, index=False, encoding='utf-8-sig')
+        print(f"\n清洗完成，结果保存到: {output_file}")
+        print(f"最终保存行数: {len(df_cleaned)}")
+    else:
+        print("\n清洗后没有数据可保存。")
+
+
+def read_raw_data(input_file='datas/全国省会二手车详细数据.csv'):
+    """读取爬取的原始 CSV，文件名忽略大小写，并依次尝试多种编码"""
+    # 1. & 2. 文件路径定义 (与原代码类似)
+    current_dir = os.getcwd()
+    print(f"\n当前工作目录: {current_dir}")
+    input_dir = os.path.dirname(input_file) or '.'
+
+    # 3. 检查输入文件 (与原代码类似)
+    file_exists = False
+    actual_filename = None
+
+    # 检查输入目录下的文件（忽略文件名大小写）
+    for f in os.listdir(input_dir):
+        if f.lower() == os.path.basename(input_file).lower():
+            file_exists = True
+            actual_filename = os.path.join(input_dir, f)
+            break
+
+    if not file_exists:
+        raise FileNotFoundError(f"未找到文件: {input_file}")
+
+    print(f"\n找到文件: {actual_filename}")
+
+    # 4. 尝试多种编码方式读取
+    encodings = ['utf-8', 'gbk', 'utf-16', 'latin1']
+    df = None
+
+    for encoding in encodings:
+        try:
+            # 爬取结果本身都是文本，按字符串读取，避免 "12.50" 之类的数值被转换成浮点数后
+            # 价格/里程清洗函数无法识别；只有空单元格视为缺失值，与直接传入爬虫结果时一致
+            df = pd.read_csv(actual_filename, encoding=encoding, dtype=str, keep_default_na=False, na_values=[''])
+            print(f"成功使用编码: {encoding}")
+            break
+        except UnicodeDecodeError as e:
+            print(f"尝试编码 {encoding} 失败: {str(e)}")
+            continue
+        except Exception as e:
+            print(f"读取文件时出错({encoding}): {str(e)}")
+            continue
+
+    if df is None:
+        raise ValueError("无法用任何编码读取文件")
+
+    print(f"\n原始数据读取成功，行数: {len(df)}")
+    print(f"原始列名: {df.columns.tolist()}")
+    return df
+
+
 # --- 重构 clean_used_car_data 函数 ---
-def clean_used_car_data():
+def clean_used_car_data(input_file='datas/全国省会二手车详细数据.csv',
+                        output_file=os.path.join('datas', '二手车清洗结果.csv')):
     try:
-        # 1. & 2. 文件路径定义 (与原代码类似)
-        current_dir = os.getcwd()
-        print(f"\n当前工作目录: {current_dir}")
-        input_file = 'datas/全国省会二手车详细数据.csv'  # 修改为datas目录下
-        output_dir = 'datas'
-        output_file = os.path.join(output_dir, '二手车清洗结果.csv')  # 输出仍在datas目录
-
-        # 3. 检查输入文件 (与原代码类似)
-        file_exists = False
-        actual_filename = None
-
-        # 检查datas目录下的文件
-        for f in os.listdir('datas'):
-            if f.lower() == os.path.basename(input_file).lower():
-                file_exists = True
-                actual_filename = os.path.join('datas', f)
-                break
-
-        if not file_exists:
-            raise FileNotFoundError(f"未找到文件: {input_file}")
-
-        print(f"\n找到文件: {actual_filename}")
-
-        # 4. 尝试多种编码方式读取
-        encodings = ['utf-8', 'gbk', 'utf-16', 'latin1']
-        df = None
-
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(actual_filename, encoding=encoding)
-                print(f"成功使用编码: {encoding}")
-                break
-            except UnicodeDecodeError as e:
-                print(f"尝试编码 {encoding} 失败: {str(e)}")
-                continue
-            except Exception as e:
-                print(f"读取文件时出错({encoding}): {str(e)}")
-                continue
-
-        if df is None:
-            raise ValueError("无法用任何编码读取文件")
-
-        print(f"\n原始数据读取成功，行数: {len(df)}")
-        print(f"原始列名: {df.columns.tolist()}")
-
-        # --- 开始重构的数据清洗和特征工程流程 ---
-        print("\n开始详细数据预处理...")
-
-        # 步骤 A: 初始列名清理和统一化 (例如，去除列名中的空格)
-        df.columns = df.columns.str.strip()
-
-        # 步骤 B: 合并相似列，优先使用更详细或可靠的来源
-        # (与 CarDataProcessor 中的逻辑类似)
-        df['车辆ID'] = df['车辆ID'].astype(str).replace('未知', np.nan)
-
-        # 合并价格，并重命名为 价格_万
-        df['价格_万'] = df['价格(万)'].combine_first(df['列表_价格(万)'])
-        if '价格(万)' in df.columns: df.drop(columns=['价格(万)'], inplace=True, errors='ignore')
-        if '列表_价格(万)' in df.columns: df.drop(columns=['列表_价格(万)'], inplace=True, errors='ignore')
-
-        # 合并里程，并重命名为 里程_万公里
-        df['里程_万公里'] = df['表显里程'].combine_first(df['列表_里程(万公里)']).combine_first(df['档案_表显里程'])
-        if '表显里程' in df.columns: df.drop(columns=['表显里程'], inplace=True, errors='ignore')
-        if '列表_里程(万公里)' in df.columns: df.drop(columns=['列表_里程(万公里)'], inplace=True, errors='ignore')
-        if '档案_表显里程' in df.columns: df.drop(columns=['档案_表显里程'], inplace=True, errors='ignore')
-
-        df['上牌时间_原始'] = df['上牌时间'].combine_first(df['列表_上牌时间']).combine_first(df['档案_上牌时间'])
-        if '上牌时间' in df.columns: df.drop(columns=['上牌时间'], inplace=True, errors='ignore')
-        if '列表_上牌时间' in df.columns: df.drop(columns=['列表_上牌时间'], inplace=True, errors='ignore')
-        if '档案_上牌时间' in df.columns: df.drop(columns=['档案_上牌时间'], inplace=True, errors='ignore')
-
-        # 合并车名，并重命名为 车名
-        df['车名'] = df['车辆名称'].combine_first(df['列表_车名'])
-        if '车辆名称' in df.columns: df.drop(columns=['车辆名称'], inplace=True, errors='ignore')
-        if '列表_车名' in df.columns: df.drop(columns=['列表_车名'], inplace=True, errors='ignore')
-
-        # 发动机信息也可能来自多个列，这里简化处理，假设原始 '发动机' 列存在
-
-        # 步骤 C: 提取品牌 (与原代码类似，但确保在列合并后)
-        if '车名' in df.columns:
-            df['品牌'] = df['车名'].apply(extract_brand)
-            # df['品牌'] = df['品牌'].replace('T', 'T-ROC探歌') # 此特定替换可能不再需要或需要调整
-            print("品牌提取完成。")
-        else:
-            df['品牌'] = np.nan
-            print("警告: '车名' 列不存在，无法提取品牌。")
-
-        # 步骤 D: 数据类型转换和特定列清洗
-        # 价格
-        if '价格_万' in df.columns:
-            df['价格_万'] = df['价格_万'].apply(clean_price_value)
-        # 里程
-        if '里程_万公里' in df.columns:
-            df['里程_万公里'] = df['里程_万公里'].apply(clean_mileage_value)
-        # 上牌时间 -> 年份和月份
-        if '上牌时间_原始' in df.columns:
-            parsed_dates = df['上牌时间_原始'].apply(parse_registration_date_value)
-            df['上牌年份'] = parsed_dates.dt.year.astype('Int64')
-            df['上牌月份'] = parsed_dates.dt.month.astype('Int64')
-            df.drop(columns=['上牌时间_原始'], inplace=True, errors='ignore')
-
-        # 挡位排量 -> 变速箱类型 (不再提取排量(L) 从这里)
-        if '挡位排量' in df.columns:
-            df['挡位排量_str'] = df['挡位排量'].astype(str)
-            df['变速箱类型'] = df['挡位排量_str'].apply(
-                lambda x: x.split('/')[0].strip() if isinstance(x, str) and '/' in x else x.strip() if isinstance(x,
-                                                                                                                  str) else np.nan)
-            df.drop(columns=['挡位排量_str'], inplace=True, errors='ignore')
-            if '挡位排量' in df.columns: df.drop(columns=['挡位排量'], inplace=True, errors='ignore')
-
-        # 发动机信息解析
-        if '发动机' in df.columns:
-            df['发动机_str'] = df['发动机'].astype(str).str.upper()
-            displacement_pattern = r'(\d+\.\d+|\d+)\s*([TL])?'
-            displacement_matches = df['发动机_str'].str.extract(displacement_pattern)
-            df['排量_L'] = pd.to_numeric(displacement_matches[0], errors='coerce')  # 重命名为 排量_L
-
-            horsepower_pattern = r'(\d+)\s*(?:马力|PS)'
-            df['发动机马力_PS'] = df['发动机_str'].str.extract(horsepower_pattern, flags=re.IGNORECASE)[0]
-            df['发动机马力_PS'] = pd.to_numeric(df['发动机马力_PS'], errors='coerce').astype('Int64')
-
-            df.drop(columns=['发动机_str'], inplace=True, errors='ignore')
-            df.drop(columns=['发动机'], inplace=True, errors='ignore')  # 删除原始发动机列
-        else:  # 如果原始发动机列不存在，则创建空的派生列
-            df['排量_L'] = np.nan
-            df['发动机马力_PS'] = np.nan
-
-        # 过户次数
-        if '过户次数' in df.columns:
-            df['过户次数'] = df['过户次数'].astype(str).str.extract(r'(\d+)').iloc[:, 0]
-            df['过户次数'] = pd.to_numeric(df['过户次数'], errors='coerce').astype('Int64')
-
-        # 燃油标号 (与原代码类似，但确保在列合并和类型转换后)
-        if '燃油标号' in df.columns:
-            df = df[df['燃油标号'].astype(str).str.contains('92|95', na=False)]
-            print(f"燃油标号过滤后，剩余行数: {len(df)}")
-
-        # 步骤 E: 文本列统一清理
-        text_columns_to_clean = ['车名', '品牌', '城市', '经销商ID', '排放标准', '车辆级别',
-                                 '车身颜色', '燃油标号', '驱动方式', '变速箱类型']
-        # '发动机进气形式', '发动机气缸排列' 已移除
-        for col in text_columns_to_clean:
-            if col in df.columns:
-                df[col] = clean_text_series(df[col])
-                df[col].replace('', np.nan, inplace=True)  # 清理后的空字符串转为NaN
-
-        # 步骤 F: 定义最终保留的列 (已更新列名和顺序)
-        final_columns_ordered = [
-            '车辆ID', '车名', '品牌', '城市',
-            '价格_万', '里程_万公里', '上牌年份', '上牌月份',
-            '变速箱类型', '排量_L', '发动机马力_PS',  # 更新为 排量_L
-            '排放标准', '过户次数', '车辆级别', '车身颜色',
-            '燃油标号', '驱动方式', '经销商ID'
-        ]
-        existing_final_columns = [col for col in final_columns_ordered if col in df.columns]
-        df_selected = df[existing_final_columns].copy()
-        print(f"\n选择最终列后，数据形状: {df_selected.shape}")
-        print(f"最终列: {df_selected.columns.tolist()}")
-
-        # 步骤 G: 去重和处理缺失值
-        # 移除无效车辆ID的行 (如果之前未完全处理)
-        df_selected.dropna(subset=['车辆ID'], inplace=True)
-        # 基于车辆ID去重
-        df_selected.sort_values(by=['车辆ID'], ascending=[True], inplace=True)  # 确保去重一致性
-        df_selected.drop_duplicates(subset=['车辆ID'], keep='first', inplace=True)
-        # 移除完全重复的行
-        df_selected.drop_duplicates(inplace=True)
-        print(f"去重后，数据形状: {df_selected.shape}")
-
-        # 移除在所有最终选定列上存在任何缺失值的行
-        # 特别注意，如果 extract_brand 返回 None (例如品牌为全英文或仅为"款")，品牌列会有 NaN，这一步会移除这些行
-        rows_before_final_dropna = len(df_selected)
-        df_cleaned = df_selected.dropna(subset=df_selected.columns)  # dropna on all columns of df_selected
-        rows_after_final_dropna = len(df_cleaned)
-        print(
-            f"移除所有列中含任何NaN的行后，数据形状: {df_cleaned.shape}. 移除了 {rows_before_final_dropna - rows_after_final_dropna} 行.")
-
-        # 步骤 H: 保存结果 (与原代码类似)
-        if len(df_cleaned) > 0:
-            os.makedirs(output_dir, exist_ok=True)
-            df_cleaned.to_csv(output_file, index=False, encoding='utf-8-sig')
-            print(f"\n清洗完成，结果保存到: {output_file}")
-            print(f"最终保存行数: {len(df_cleaned)}")
-        else:
-            print("\n清洗后没有数据可保存。")
+        df = read_raw_data(input_file)
+        df_cleaned = clean_car_dataframe(df)
+        save_cleaned_data(df_cleaned, output_file)
 
         print("操作成功完成！")
         return True
@@ -287,40 +292,56 @@ def clean_used_car_data():
         return False
 
 
-# 执行清洗函数
-if clean_used_car_data():
-    print("程序执行成功")
-else:
-    print("程序执行失败")
-
-# 读取清洗后的二手车数据
-df = pd.read_csv('datas/二手车清洗结果.csv')
-
-# 删除车辆级别为NaN的数据，并统计删除数量
-if '车辆级别' in df.columns:
-    before_drop = len(df)
-    df = df.dropna(subset=['车辆级别'])
-    after_drop = len(df)
-    print(f"删除车辆级别为NaN的数据后，数据量减少 {before_drop - after_drop} 行")
-if '车身颜色' in df.columns:
-    def clean_color(x):
-        if '/' in x:
-            idx = x.find('/')
-            # 删除“/”及其后面一个字，保留前面部分和后面剩余部分
-            return x[:idx] + x[idx + 2:] if len(x) > idx + 1 else x[:idx]
-        return x
-
-
-    df['车身颜色'] = df['车身颜色'].astype(str).apply(clean_color)
-
-# 只保留车身颜色不是“其他”的数据
-if '车身颜色' in df.columns:
-    before_color = len(df)
-    df = df[df['车身颜色'] != '其它']
-    after_color = len(df)
-    print(f"只保留车身颜色不是“其他”的数据后，数据量减少 {before_color - after_color} 行")
-
-# 输出最终处理后数据的总数
-print(f"最终处理后数据共 {len(df)} 条")
-# 保存预处理后的数据
-df.to_csv('datas/二手车预处理结果.csv', index=False)
+def clean_color(x):
+    if '/' in x:
+        idx = x.find('/')
+        # 删除“/”及其后面一个字，保留前面部分和后面剩余部分
+        return x[:idx] + x[idx + 2:] if len(x) > idx + 1 else x[:idx]
+    return x
+
+
+def postprocess_cleaned_data(df):
+    """对清洗结果做进一步过滤：删除车辆级别缺失的行、规范车身颜色并去掉“其它”颜色"""
+    # 删除车辆级别为NaN的数据，并统计删除数量
+    if '车辆级别' in df.columns:
+        before_drop = len(df)
+        df = df.dropna(subset=['车辆级别'])
+        after_drop = len(df)
+        print(f"删除车辆级别为NaN的数据后，数据量减少 {before_drop - after_drop} 行")
+    if '车身颜色' in df.columns:
+        df['车身颜色'] = df['车身颜色'].astype(str).apply(clean_color)
+
+    # 只保留车身颜色不是“其他”的数据
+    if '车身颜色' in df.columns:
+        before_color = len(df)
+        df = df[df['车身颜色'] != '其它']
+        after_color = len(df)
+        print(f"只保留车身颜色不是“其他”的数据后，数据量减少 {before_color - after_color} 行")
+    return df
+
+
+def save_preprocessed_data(df, output_file='datas/二手车预处理结果.csv'):
+    """保存预处理结果，并把新增的行合并进聚合立方体和特征存储，供可视化和模型训练直接使用"""
+    # 输出最终处理后数据的总数
+    print(f"最终处理后数据共 {len(df)} 条")
+    # 保存预处理后的数据
+    df.to_csv(output_file, index=False)
+    refresh_cube(df)
+    update_feature_store(df)
+
+
+def main():
+    # 执行清洗函数
+    if clean_used_car_data():
+        print("程序执行成功")
+    else:
+        print("程序执行失败")
+
+    # 读取清洗后的二手车数据
+    df = pd.read_csv('datas/二手车清洗结果.csv')
+    df = postprocess_cleaned_data(df)
+    save_preprocessed_data(df)
+
+
+if __name__ == "__main__":
+    main()
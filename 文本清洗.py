@@ -0,0 +1,57 @@
+import re
+
+import pandas as pd
+
+# 爬虫入库时的清洗：删除制表/换行符，只保留 ASCII、常用汉字和中文标点（全角空格、\xa0、零宽空格等都会被删掉）。
+# 原实现是三次 str.replace 加两次 re.sub，这里合并为一个预编译的字符类，一次扫描完成。
+_CRAWL_DROP = re.compile(r'[^\x00-\x08\x0b\x0c\x0e-\x7f\u4e00-\u9fff，。！？、（）【】《》“”‘’：；]')
+
+# 预处理时的清洗：特殊空白先统一为空格，连续空白合并为一个空格，再删除非单词字符和常用标点之外的符号。
+_SPACE_TABLE = str.maketrans({'\u3000': ' ', '\xa0': ' ', '\u200b': ' '})
+_VALUE_FUSED = re.compile(
+    r'(\s+)|[^\w\s.,!?;:\'"()\[\]{}<>@#$%^&*\-_+=/\\|`~·！￥（）——【】《》？，。；：‘’“”€£¥]+')
+
+
+def _value_replacement(match):
+    return ' ' if match.group(1) else ''
+
+
+def clean_text(text):
+    """清洗文本，去除不可见字符和常见乱码"""
+    if not isinstance(text, str):
+        return text
+    return _CRAWL_DROP.sub('', text).strip()
+
+
+def clean_texts(values):
+    """批量版 clean_text：对列表等可迭代对象逐个清洗，相同的字符串只处理一次，返回列表"""
+    cache = {}
+    cleaned = []
+    for value in values:
+        if isinstance(value, str):
+            result = cache.get(value)
+            if result is None:
+                result = cache[value] = clean_text(value)
+            cleaned.append(result)
+        else:
+            cleaned.append(value)
+    return cleaned
+
+
+def clean_text_value(text):
+    """清洗单个文本数据，去除不可见字符和常见乱码，规范化空格"""
+    if not isinstance(text, str):
+        return text
+    return _VALUE_FUSED.sub(_value_replacement, text.translate(_SPACE_TABLE)).strip()
+
+
+def clean_text_series(series):
+    """对整个 Series 做文本清理：先按取值去重（品牌、城市等列重复度很高），每个不同取值只清洗一次再映射回去"""
+    if series is None or series.empty:
+        return series
+    values = series.astype(str)
+    # pandas 3 的 astype(str) 会保留缺失值，不能用 -1 哨兵编码，否则 take() 会取到最后一个取值
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    cleaned = pd.Index([clean_text_value(value) for value in uniques], dtype=object)
+    return pd.Series(cleaned.take(codes), index=series.index, name=series.name, dtype=values.dtype)
+
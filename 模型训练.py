@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold, cross_validate, train_test_split
+
+from 特征存储 import (CATEGORICAL_FEATURES, DEFAULT_STORE_DIR, FEATURES, TARGET, FeatureStore,
+                  update_feature_store)
+
+DEFAULT_MODEL_FILE = 'datas/二手车价格模型.pkl'
+
+# backend='auto' 时超过该行数改用直方图梯度提升，训练时间近似线性增长
+HGB_AUTO_THRESHOLD = 200000
+# 直方图梯度提升对类别特征的基数上限（与 max_bins 一致），超过则按序数特征处理
+HGB_MAX_CATEGORIES = 255
+
+
+def build_model(backend, n_jobs=-1, categorical_mask=None):
+    """
+    创建回归模型。
+    - 'rf': 随机森林，n_jobs=-1 使用全部 CPU 核心并行建树；
+    - 'hgb': 直方图梯度提升，对大数据量训练更快，内部按 OpenMP 多线程执行。
+    """
+    if backend == 'rf':
+        return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    if backend == 'hgb':
+        return HistGradientBoostingRegressor(max_iter=300, early_stopping=True, random_state=42,
+                                             categorical_features=categorical_mask)
+    raise ValueError(f"未知的模型类型: {backend}")
+
+
+def resolve_backend(backend, n_rows):
+    if backend == 'auto':
+        return 'hgb' if n_rows > HGB_AUTO_THRESHOLD else 'rf'
+    return backend
+
+
+def feature_schema_hash(backend):
+    """特征定义、目标列和模型类型的哈希，任一项变化都会使已保存的模型失效"""
+    schema = {'features': FEATURES, 'categorical': CATEGORICAL_FEATURES, 'target': TARGET, 'backend': backend,
+              'encoding': 'feature_store_vocab'}
+    return hashlib.sha256(json.dumps(schema, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+def _feature_importance(model, X_test, y_test):
+    if hasattr(model, 'feature_importances_'):
+        importances = model.feature_importances_
+    else:
+        # 梯度提升模型没有内置特征重要性，在测试集（最多 1 万行）上计算置换重要性
+        rows = np.random.default_rng(42).permutation(len(X_test))[:10000]
+        result = permutation_importance(model, X_test[rows], y_test[rows], n_repeats=5,
+                                        random_state=42, n_jobs=-1)
+        importances = result.importances_mean
+    return pd.DataFrame({
+        '特征': FEATURES,
+        '重要性': importances
+    }).sort_values(by='重要性', ascending=False)
+
+
+def cross_validate_model(model, X, y, cv=5):
+    """K 折交叉验证，各折在多个进程中并行训练（内存映射的 X/y 按文件引用传给子进程，不会被复制）"""
+    estimator = clone(model)
+    if 'n_jobs' in estimator.get_params():
+        # 折之间已经并行，单个模型内部不再多进程，避免 CPU 过度订阅
+        estimator.set_params(n_jobs=1)
+    scores = cross_validate(estimator, X, y, cv=KFold(n_splits=cv, shuffle=True, random_state=42),
+                            scoring=('neg_root_mean_squared_error', 'r2'), n_jobs=-1)
+    return {
+        'cv_rmse': float(-scores['test_neg_root_mean_squared_error'].mean()),
+        'cv_r2': float(scores['test_r2'].mean()),
+    }
+
+
+def train_price_model(X, y, vocab, backend='auto', cv=0, n_jobs=-1):
+    """在特征存储的矩阵上训练价格模型，返回包含模型、词表、评估指标和特征重要性的模型包"""
+    backend = resolve_backend(backend, len(y))
+    categorical_mask = [col in CATEGORICAL_FEATURES and len(vocab[col]) <= HGB_MAX_CATEGORIES
+                        for col in FEATURES]
+    model = build_model(backend, n_jobs=n_jobs, categorical_mask=np.array(categorical_mask))
+
+    # 分割数据集
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model.fit(X_train, y_train)
+
+    # 模型评估
+    y_pred = model.predict(X_test)
+    metrics = {
+        'rmse': float(mean_squared_error(y_test, y_pred) ** 0.5),
+        'r2': float(r2_score(y_test, y_pred)),
+    }
+    if cv and cv > 1:
+        metrics.update(cross_validate_model(model, X, y, cv=cv))
+
+    return {
+        'model': model,
+        # 词表只追加不修改，保存训练时的副本即可与特征存储保持一致的编码
+        'vocab': {col: list(values) for col, values in vocab.items()},
+        'features': FEATURES,
+        'backend': backend,
+        'schema_hash': feature_schema_hash(backend),
+        'metrics': metrics,
+        'feature_importance': _feature_importance(model, X_test, y_test),
+    }
+
+
+def save_model(bundle, path=DEFAULT_MODEL_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump(bundle, path)
+
+
+def load_model(path=DEFAULT_MODEL_FILE):
+    return joblib.load(path)
+
+
+def train_or_load_model(df=None, backend='auto', path=DEFAULT_MODEL_FILE, cv=0, force=False,
+                        store_dir=DEFAULT_STORE_DIR):
+    """
+    先用 df（当前的全量预处理数据）同步特征存储，df 为空时直接使用存储的最新版本；
+    该版本恰好是当前的数据集，其 data_hash 是这组车源编码后 X/y 内容的指纹。
+    特征定义和训练数据指纹都没有变化时复用已保存的模型，否则只在该版本的数据上重新训练并保存。
+    交叉验证需要额外训练 cv 次，默认关闭，只在明确指定 cv 时执行。
+    """
+    store = update_feature_store(df, store_dir) if df is not None else FeatureStore(store_dir)
+    version = store.get_version()
+    resolved = resolve_backend(backend, version['n_rows'])
+    if not force and os.path.exists(path):
+        bundle = load_model(path)
+        if (bundle.get('schema_hash') == feature_schema_hash(resolved)
+                and bundle.get('data_hash') == version['data_hash']
+                and (not cv or 'cv_rmse' in bundle['metrics'])):
+            print(f"数据未变化，复用已保存的模型: {path}")
+            return bundle
+
+    print(f"开始训练模型（{resolved}，特征存储 v{version['version']}，{version['n_rows']} 行）...")
+    X, y = store.load(version['version'])
+    bundle = train_price_model(X, y, store.vocab, backend=resolved, cv=cv)
+    bundle['data_hash'] = version['data_hash']
+    bundle['store_version'] = version['version']
+    save_model(bundle, path)
+    print(f"模型已保存到: {path}")
+    return bundle
+
+
+def print_metrics(metrics):
+    print(f"模型评估结果：")
+    print(f"  RMSE 均方根误差: {metrics['rmse']:.2f} 万元")
+    print(f"  R² 决定系数: {metrics['r2']:.2f}")
+    if 'cv_rmse' in metrics:
+        print(f"  交叉验证 RMSE: {metrics['cv_rmse']:.2f} 万元")
+        print(f"  交叉验证 R²: {metrics['cv_r2']:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='训练二手车价格模型')
+    parser.add_argument('--data', default='datas/二手车预处理结果.csv',
+                        help='预处理后的数据文件，训练前先用它同步特征存储')
+    parser.add_argument('--backend', choices=['auto', 'rf', 'hgb'], default='auto',
+                        help='模型类型：rf 随机森林，hgb 直方图梯度提升，auto 按数据量自动选择')
+    parser.add_argument('--cv', type=int, default=0, help='交叉验证折数，默认 0 表示不做交叉验证')
+    parser.add_argument('--force', action='store_true', help='忽略已保存的模型，强制重新训练')
+    args = parser.parse_args()
+
+    bundle = train_or_load_model(pd.read_csv(args.data), backend=args.backend, cv=args.cv, force=args.force)
+    print_metrics(bundle['metrics'])
@@ -0,0 +1,180 @@
+import argparse
+import json
+import sys
+import time
+
+# 本文件只导入标准库，pandas / matplotlib / scikit-learn 等重型依赖都在各阶段函数内部按需导入，
+# 因此 --help、predict 等轻量命令不必为用不到的库付出启动时间。
+
+RAW_FILE = 'datas/全国省会二手车详细数据.csv'
+CLEANED_FILE = 'datas/二手车清洗结果.csv'
+DATA_FILE = 'datas/二手车预处理结果.csv'
+
+STAGES = ['crawl', 'clean', 'preprocess', 'charts', 'train', 'predict']
+DEFAULT_RUN_STAGES = ['crawl', 'clean', 'preprocess', 'charts', 'train']
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def _load_preprocessed(ctx):
+    """取上一阶段留在内存中的预处理结果，没有时才读取文件"""
+    if ctx.get('data') is None:
+        import pandas as pd
+        ctx['data'] = pd.read_csv(DATA_FILE)
+    return ctx['data']
+
+
+def stage_crawl(ctx, args):
+    import pandas as pd
+    from 数据爬取 import CSV_FIELDS, main as crawl
+
+    cars = crawl(cities=_split(args.cities), pages=args.pages, filename=RAW_FILE)
+    ctx['raw'] = pd.DataFrame(cars, columns=CSV_FIELDS)
+
+
+def stage_clean(ctx, args):
+    from 数据预处理 import clean_car_dataframe, read_raw_data, save_cleaned_data
+
+    raw = ctx.pop('raw', None)
+    if raw is None:
+        raw = read_raw_data(RAW_FILE)
+    ctx['cleaned'] = clean_car_dataframe(raw)
+    save_cleaned_data(ctx['cleaned'], CLEANED_FILE)
+
+
+def stage_preprocess(ctx, args):
+    import pandas as pd
+    from 数据预处理 import postprocess_cleaned_data, save_preprocessed_data
+
+    cleaned = ctx.pop('cleaned', None)
+    if cleaned is None:
+        cleaned = pd.read_csv(CLEANED_FILE)
+    ctx['data'] = postprocess_cleaned_data(cleaned)
+    save_preprocessed_data(ctx['data'], DATA_FILE)
+
+
+def stage_charts(ctx, args):
+    from 数据可视化 import main as render_charts
+
+    render_charts(batch=not args.show, scatter_mode=args.scatter_mode, workers=args.workers,
+                  backend=args.backend, df=ctx.get('data'), charts=_split(args.charts))
+
+
+def stage_train(ctx, args):
+    from 模型训练 import print_metrics, train_or_load_model
+    from 特征存储 import FeatureStore
+
+    df = ctx.get('data')
+    if df is None and FeatureStore().latest_version is None:
+        # 特征存储为空（例如从未运行过预处理阶段）时才回退到读取预处理结果文件
+        df = _load_preprocessed(ctx)
+    bundle = train_or_load_model(df, backend=args.backend, cv=args.cv, force=args.force)
+    print_metrics(bundle['metrics'])
+
+
+def stage_predict(ctx, args):
+    if args.serve:
+        from 价格预测 import serve
+        serve(args.host, args.port)
+        return
+
+    listings = [json.loads(listing) for listing in args.listing or []]
+    if args.input:
+        with open(args.input, encoding='utf-8') as f:
+            payload = json.load(f)
+        listings.extend(payload if isinstance(payload, list) else [payload])
+    if not listings:
+        print("predict 阶段需要 --listing、--input 或 --serve 参数，已跳过")
+        return
+
+    from 价格预测 import PricePredictor
+    predictions = PricePredictor().predict(listings)
+    print(json.dumps(predictions, ensure_ascii=False, indent=2))
+
+
+STAGE_FUNCS = {
+    'crawl': stage_crawl,
+    'clean': stage_clean,
+    'preprocess': stage_preprocess,
+    'charts': stage_charts,
+    'train': stage_train,
+    'predict': stage_predict,
+}
+
+
+def run_stages(stages, args):
+    """按流水线顺序执行所选阶段，阶段之间通过 ctx 在内存中传递数据，不重复读取中间文件"""
+    unknown = [stage for stage in stages if stage not in STAGE_FUNCS]
+    if unknown:
+        raise SystemExit(f"未知的阶段: {unknown}，可选: {STAGES}")
+    ctx = {}
+    for stage in sorted(set(stages), key=STAGES.index):
+        print(f"\n===== 阶段 {stage} =====")
+        start = time.perf_counter()
+        STAGE_FUNCS[stage](ctx, args)
+        print(f"===== 阶段 {stage} 完成，用时 {time.perf_counter() - start:.2f} 秒 =====")
+
+
+def build_parser():
+    crawl_opts = argparse.ArgumentParser(add_help=False)
+    crawl_opts.add_argument('--cities', default=None, help='逗号分隔的城市名或拼音，默认爬取全部省会城市')
+    crawl_opts.add_argument('--pages', type=int, default=5,
+                            help='每个城市爬取的页数，0 表示一直翻到最后一页。快照历史只在翻到了最后一页的城市内'
+                                 '把消失的车源记为下架，其余城市未爬到的车源原样保留；需要完整的下架记录时使用 --pages 0')
+
+    model_opts = argparse.ArgumentParser(add_help=False)
+    model_opts.add_argument('--backend', choices=['auto', 'rf', 'hgb'], default='auto', help='价格模型类型')
+
+    chart_opts = argparse.ArgumentParser(add_help=False)
+    chart_opts.add_argument('--charts', default=None,
+                            help='逗号分隔的图表名称（scatter,year,brand,level,importance），默认全部')
+    chart_opts.add_argument('--scatter-mode', choices=['auto', 'full', 'sample', 'density'], default='auto')
+    chart_opts.add_argument('--workers', type=int, default=None, help='绘图进程数')
+    chart_opts.add_argument('--show', action='store_true', help='逐个弹出图表窗口，默认离屏批量渲染')
+
+    train_opts = argparse.ArgumentParser(add_help=False)
+    train_opts.add_argument('--cv', type=int, default=0, help='交叉验证折数，默认 0 表示不做交叉验证')
+    train_opts.add_argument('--force', action='store_true', help='忽略已保存的模型，强制重新训练')
+
+    predict_opts = argparse.ArgumentParser(add_help=False)
+    predict_opts.add_argument('--listing', action='append', help='单条车辆信息 JSON，可重复指定')
+    predict_opts.add_argument('--input', default=None, help='车辆信息 JSON 文件（对象或列表）')
+    predict_opts.add_argument('--serve', action='store_true', help='启动 HTTP 预测服务')
+    predict_opts.add_argument('--host', default='127.0.0.1')
+    predict_opts.add_argument('--port', type=int, default=8000)
+
+    parser = argparse.ArgumentParser(description='二手车数据流水线：爬取、清洗、预处理、图表、训练、预测')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('crawl', parents=[crawl_opts], help='爬取二手车数据')
+    sub.add_parser('clean', help='清洗原始爬取数据')
+    sub.add_parser('preprocess', help='过滤清洗结果并更新聚合立方体和特征存储')
+    sub.add_parser('charts', parents=[chart_opts, model_opts], help='生成分析图表')
+    sub.add_parser('train', parents=[model_opts, train_opts], help='训练价格模型')
+    sub.add_parser('predict', parents=[predict_opts], help='预测车辆价格或启动预测服务')
+    run = sub.add_parser('run', parents=[crawl_opts, chart_opts, model_opts, train_opts, predict_opts],
+                         help='按顺序执行多个阶段，阶段之间在内存中传递数据')
+    run.add_argument('--stages', default=','.join(DEFAULT_RUN_STAGES),
+                     help=f"逗号分隔的阶段，可选: {','.join(STAGES)}")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    stages = _split(args.stages) if args.command == 'run' else [args.command]
+    # 子命令只定义了自己需要的参数，其余阶段参数补上默认值，便于各阶段函数统一读取
+    defaults = build_parser().parse_args(['run'])
+    for key, value in vars(defaults).items():
+        if not hasattr(args, key):
+            setattr(args, key, value)
+    run_stages(stages, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
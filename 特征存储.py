@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['里程_万公里', '上牌年份', '品牌', '车辆级别']
+CATEGORICAL_FEATURES = ['品牌', '车辆级别']
+TARGET = '价格_万'
+DEFAULT_STORE_DIR = 'datas/特征存储'
+
+X_DTYPE = np.float32  # 树模型内部本就使用 float32，存储为同一类型可以避免训练时再复制一次
+Y_DTYPE = np.float64
+ROW_DTYPE = np.int64
+
+
+class FeatureStore:
+    """
+    价格模型的特征矩阵存储。
+    - 分类特征使用持久化、只追加的词表编码，同一个品牌/车辆级别在任何一次运行中的整数编码都不变；
+    - 特征矩阵 X、目标 y 和每行对应的车辆ID以原始二进制/文本文件只追加写入（行日志），读取时通过 np.memmap 映射；
+    - 每次用当前的全量数据同步：新车源追加新行；价格或特征变化的车源先把旧行号记入墓碑文件，再追加新行；
+      当前数据中已不存在的车源只记墓碑。版本 k = 行日志的前 log_rows 行去掉前 n_dead 个墓碑行，
+      恰好等于该次同步时的数据集，旧版本仍可原样读取；
+    - 版本的 data_hash 是该版本全部有效行 X/y 内容的哈希，训练数据相同则哈希相同。
+    manifest 是唯一的提交点：数据文件中超出 manifest 记录长度的部分（例如同步中途被中断留下的字节）
+    在读取时被忽略，并在下次同步前截掉。
+    目录结构：manifest.json（词表和版本列表）、X.f32、y.f64、ids.txt（每行的车辆ID）、dead.i64（墓碑行号）。
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.x_path = os.path.join(root, 'X.f32')
+        self.y_path = os.path.join(root, 'y.f64')
+        self.ids_path = os.path.join(root, 'ids.txt')
+        self.dead_path = os.path.join(root, 'dead.i64')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {
+                'features': FEATURES,
+                'vocab': {col: [] for col in CATEGORICAL_FEATURES},
+                'log_rows': 0,
+                'ids_bytes': 0,
+                'n_dead': 0,
+                'versions': [],
+            }
+
+    @property
+    def vocab(self):
+        return self.manifest['vocab']
+
+    @property
+    def latest_version(self):
+        return self.manifest['versions'][-1] if self.manifest['versions'] else None
+
+    def _save_manifest(self):
+        # 先写临时文件再替换，避免中途中断留下半个 manifest
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _truncate_uncommitted(self):
+        """把数据文件截回 manifest 记录的长度，丢弃上次同步中断时留下的未提交数据"""
+        sizes = {
+            self.x_path: self.manifest['log_rows'] * len(FEATURES) * np.dtype(X_DTYPE).itemsize,
+            self.y_path: self.manifest['log_rows'] * np.dtype(Y_DTYPE).itemsize,
+            self.ids_path: self.manifest['ids_bytes'],
+            self.dead_path: self.manifest['n_dead'] * np.dtype(ROW_DTYPE).itemsize,
+        }
+        for path, size in sizes.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _log_ids(self):
+        if not self.manifest['ids_bytes']:
+            return np.array([], dtype=object)
+        with open(self.ids_path, 'rb') as f:
+            return np.array(f.read(self.manifest['ids_bytes']).decode('utf-8').splitlines(), dtype=object)
+
+    def _live_rows(self, log_rows, n_dead):
+        """行日志前 log_rows 行中除去前 n_dead 个墓碑后的有效行号（升序）"""
+        live = np.ones(log_rows, dtype=bool)
+        if n_dead:
+            live[np.fromfile(self.dead_path, dtype=ROW_DTYPE, count=n_dead)] = False
+        return np.flatnonzero(live)
+
+    def _log_arrays(self, log_rows):
+        X = np.memmap(self.x_path, dtype=X_DTYPE, mode='r', shape=(log_rows, len(FEATURES)))
+        y = np.memmap(self.y_path, dtype=Y_DTYPE, mode='r', shape=(log_rows,))
+        return X, y
+
+    def _extend_vocab(self, df):
+        for col in CATEGORICAL_FEATURES:
+            known = set(self.vocab[col])
+            new_values = [value for value in pd.unique(df[col].astype(str)) if value not in known]
+            self.vocab[col].extend(sorted(new_values))
+
+    def encode(self, df):
+        """按当前词表把 df 编码为 float32 特征矩阵，词表中没有的类别编码为 NaN"""
+        X = np.empty((len(df), len(FEATURES)), dtype=X_DTYPE)
+        for j, col in enumerate(FEATURES):
+            if col in CATEGORICAL_FEATURES:
+                codes = pd.Categorical(df[col].astype(str), categories=self.vocab[col]).codes
+                X[:, j] = np.where(codes >= 0, codes, np.nan)
+            else:
+                X[:, j] = df[col].to_numpy(dtype='float64')
+        return X
+
+    def sync(self, df):
+        """
+        以 df 作为当前的全量数据同步存储（按车辆ID对应，没有车辆ID列时按行号），有变化时生成一个新版本。
+        返回 (新增, 变化, 移除) 的车源数量。
+        """
+        data = df.dropna(subset=FEATURES + [TARGET])
+        if '车辆ID' in data.columns:
+            ids = data['车辆ID'].astype(str).to_numpy(dtype=object)
+        else:
+            ids = np.arange(len(data)).astype(str).astype(object)
+        latest = ~pd.Index(ids).duplicated(keep='last')
+        data, ids = data[latest], ids[latest]
+
+        os.makedirs(self.root, exist_ok=True)
+        self._truncate_uncommitted()
+        self._extend_vocab(data)
+        X = self.encode(data)
+        y = data[TARGET].to_numpy(dtype=Y_DTYPE)
+
+        log_rows, n_dead = self.manifest['log_rows'], self.manifest['n_dead']
+        live_rows = self._live_rows(log_rows, n_dead)
+        pos = pd.Index(self._log_ids()[live_rows]).get_indexer(ids)
+        in_live = pos >= 0
+        unchanged = in_live.copy()
+        if in_live.any():
+            X_log, y_log = self._log_arrays(log_rows)
+            old_rows = live_rows[pos[in_live]]
+            old_X, new_X = X_log[old_rows], X[in_live]
+            unchanged[in_live] = (((old_X == new_X) | (np.isnan(old_X) & np.isnan(new_X))).all(axis=1)
+                                  & (y_log[old_rows] == y[in_live]))
+        kept = np.zeros(log_rows, dtype=bool)
+        kept[live_rows[pos[unchanged]]] = True
+        dead_rows = live_rows[~kept[live_rows]].astype(ROW_DTYPE)
+        fresh = ~unchanged
+        counts = (int((~in_live).sum()), int((in_live & fresh).sum()), int(len(live_rows) - in_live.sum()))
+        if not fresh.any() and not len(dead_rows):
+            return counts
+
+        with open(self.x_path, 'ab') as f:
+            f.write(X[fresh].tobytes())
+        with open(self.y_path, 'ab') as f:
+            f.write(y[fresh].tobytes())
+        id_bytes = ''.join(f'{listing_id}\n' for listing_id in ids[fresh]).encode('utf-8')
+        with open(self.ids_path, 'ab') as f:
+            f.write(id_bytes)
+        with open(self.dead_path, 'ab') as f:
+            f.write(dead_rows.tobytes())
+
+        log_rows += int(fresh.sum())
+        n_dead += len(dead_rows)
+        X_live, y_live = self._load_rows(log_rows, n_dead)
+        # 版本哈希只取决于该版本实际参与训练的 X/y 内容
+        digest = hashlib.sha256(np.ascontiguousarray(X_live).tobytes())
+        digest.update(np.ascontiguousarray(y_live).tobytes())
+        self.manifest.update({'log_rows': log_rows, 'n_dead': n_dead,
+                              'ids_bytes': self.manifest['ids_bytes'] + len(id_bytes)})
+        self.manifest['versions'].append({
+            'version': len(self.manifest['versions']) + 1,
+            'log_rows': log_rows,
+            'n_dead': n_dead,
+            'n_rows': len(y_live),
+            'data_hash': digest.hexdigest()[:16],
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        self._save_manifest()
+        return counts
+
+    def get_version(self, version=None):
+        if not self.manifest['versions']:
+            raise ValueError(f"特征存储为空: {self.root}")
+        if version is None:
+            return self.latest_version
+        for info in self.manifest['versions']:
+            if info['version'] == version:
+                return info
+        raise ValueError(f"特征存储中不存在版本 {version}")
+
+    def _load_rows(self, log_rows, n_dead):
+        X, y = self._log_arrays(log_rows)
+        if not n_dead:
+            return X, y
+        live_rows = self._live_rows(log_rows, n_dead)
+        return X[live_rows], y[live_rows]
+
+    def load(self, version=None):
+        """
+        返回 (X, y)，version 为空时读取最新版本。
+        版本中没有墓碑行时直接返回只读内存映射；有墓碑时返回去掉墓碑行后的数组副本。
+        """
+        info = self.get_version(version)
+        return self._load_rows(info['log_rows'], info['n_dead'])
+
+
+def update_feature_store(df, root=DEFAULT_STORE_DIR):
+    """用当前的全量预处理数据同步特征存储并打印结果"""
+    store = FeatureStore(root)
+    added, changed, removed = store.sync(df)
+    version = store.latest_version
+    if version:
+        print(f"特征存储已同步，新增 {added} 辆，变化 {changed} 辆，移除 {removed} 辆，"
+              f"当前版本 v{version['version']}，共 {version['n_rows']} 行")
+    return store